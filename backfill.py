@@ -0,0 +1,156 @@
+import argparse
+import numpy as np
+import pandas as pd
+import datetime as dt
+import fx
+import mongo
+import holdings
+import snapshots
+
+# ===================== SNAPSHOT BACKFILL ===================== #
+
+# days written per bulk_write; an interrupted run loses at most one chunk
+CHUNK_DAYS = 90
+
+
+def missing_days(since=None, until=None):
+    """
+    Days between `since` (default: first order or snapshot) and `until`
+    (default: yesterday) without a snapshot. Today is left to the dashboard's live snapshot.
+    """
+    existing = snapshots.snapshot_days()
+    if since is None:
+        orders = holdings.load_orders()
+        candidates = list(existing) + ([orders["date"].min()] if not orders.empty else [])
+        if not candidates:
+            return pd.DatetimeIndex([])
+        since = min(candidates)
+
+    until = until or (pd.Timestamp.now(tz="UTC").tz_localize(None).normalize() - pd.Timedelta(days=1))
+    days = pd.date_range(pd.Timestamp(since).normalize(), pd.Timestamp(until).normalize(), freq="D")
+    return days[~days.isin(list(existing))]
+
+
+def daily_savings_total(days):
+    """
+    Savings balance at the end of each day, summed from the stored savings feed items
+    the same way snapshot() does.
+    """
+    coll = mongo.get_db()["savings"]
+    projection = {"_id": 0, "direction": 1, "sourceAmount": 1, "settlementTime": 1, "transactionTime": 1}
+    items = pd.DataFrame(list(coll.find({}, projection)))
+    if items.empty:
+        return pd.Series(0.0, index=days)
+
+    when = items["settlementTime"] if "settlementTime" in items else items["transactionTime"]
+    if "transactionTime" in items:
+        when = when.fillna(items["transactionTime"])
+    dates = pd.to_datetime(when, utc=True).dt.tz_localize(None).dt.normalize()
+
+    amounts = items["sourceAmount"].map(lambda a: a["minorUnits"] / 100)
+    signs = np.select([items["direction"] == "IN", items["direction"] == "OUT"], [1, -1], 0)
+
+    per_day = pd.Series(amounts.to_numpy() * signs, index=dates).groupby(level=0).sum()
+    opening = per_day[per_day.index < days[0]].sum()
+    return per_day.reindex(days, fill_value=0).cumsum() + opening
+
+
+def build_snapshots(days, orders=None, price_file=None):
+    """
+    Snapshot documents for the days in `days`, computed in one batch from stored orders and savings items.
+    Prices come from the stored snapshots, or first from `price_file` (see holdings.csv_prices) if given.
+    Days holding a position with no price at all are left out, as their value would be understated;
+    they stay missing until a price file covers them.
+    """
+    orders = holdings.load_orders() if orders is None else orders
+    full_range = pd.date_range(days.min(), days.max(), freq="D")
+
+    positions = holdings.daily_holdings(orders, full_range[0], full_range[-1])
+    prices = holdings.snapshot_prices(full_range)
+    if price_file:
+        prices = holdings.csv_prices(price_file, full_range).combine_first(prices)
+    prices = prices.reindex(columns=positions.columns)
+    curve = holdings.portfolio_curve(full_range[0], full_range[-1], prices=prices, orders=orders)
+    savings = daily_savings_total(full_range)
+
+    docs = []
+    for day in days:
+        held = positions.loc[day]
+        held = held[held != 0]
+        day_prices = prices.loc[day, held.index].to_numpy(dtype=float)
+        if np.isnan(day_prices).any():
+            continue
+
+        # quoted price as of that day's FX rate, so fx.revalue_snapshots reprices these like live snapshots
+        quoted = day_prices / fx.fx_rates.gbp_multipliers(list(held.index), day)
+        portfolio_value = float(curve.at[day, "portfolioValue"])
+        savings_total = round(float(savings.loc[day]), 2)
+
+        docs.append({
+            "snapshotDate": day.strftime("%Y-%m-%d"),
+            "timestampAdded": (day + pd.Timedelta(hours=23, minutes=59, seconds=59)).to_pydatetime().replace(tzinfo=dt.timezone.utc),
+            "netDeposit": float(curve.at[day, "netDeposit"]),
+            "portfolioValue": portfolio_value,
+            "portfolio": [
+                {
+                    "ticker": ticker,
+                    "quantity": float(quantity),
+                    "currentPrice": float(quote),
+                    "currency": fx.instrument_currency(ticker),
+                    "priceGBP": round(float(price), 2),
+                }
+                for (ticker, quantity), price, quote in zip(held.items(), day_prices, quoted)
+            ],
+            "savingsTotal": savings_total,
+            "netWorth": round(savings_total + portfolio_value, 2),
+            "backfilled": True,
+        })
+
+    return docs
+
+
+def backfill(since=None, until=None, chunk_days=CHUNK_DAYS, dry_run=False, price_file=None):
+    """
+    Fills every missing snapshot day that can be priced. Safe to re-run or resume: days that
+    already have a snapshot are skipped and snapshots.save_many never writes a day twice.
+    """
+    days = missing_days(since, until)
+    if days.empty:
+        print("[backfill] No missing days")
+        return 0
+
+    print(f"[backfill] {len(days)} missing days between {days[0].date()} and {days[-1].date()}")
+    if not dry_run:
+        snapshots.ensure_indexes()
+
+    orders = holdings.load_orders()
+    written = 0
+
+    for i in range(0, len(days), chunk_days):
+        chunk = days[i:i + chunk_days]
+        docs = build_snapshots(chunk, orders=orders, price_file=price_file)
+        if len(docs) < len(chunk):
+            print(f"[backfill] {len(chunk) - len(docs)} days between {chunk[0].date()} and {chunk[-1].date()} "
+                  f"hold a position with no known price, skipped (see --prices)")
+
+        if dry_run:
+            print(f"[backfill] Would write {len(docs)} snapshots ({chunk[0].date()} to {chunk[-1].date()})")
+            continue
+
+        count = snapshots.save_many(docs)
+        written += count
+        print(f"[backfill] {chunk[0].date()} to {chunk[-1].date()}: {count} snapshots written")
+
+    return written
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Backfill missing daily portfolio snapshots")
+    parser.add_argument("--since", help="first day to fill, YYYY-MM-DD (default: first order or snapshot)")
+    parser.add_argument("--until", help="last day to fill, YYYY-MM-DD (default: yesterday)")
+    parser.add_argument("--chunk-days", type=int, default=CHUNK_DAYS)
+    parser.add_argument("--dry-run", action="store_true", help="report the gaps without writing")
+    parser.add_argument("--prices", help="CSV of quoted prices (date,ticker,price) for positions no snapshot has priced")
+    args = parser.parse_args()
+
+    backfill(args.since, args.until, args.chunk_days, args.dry_run, args.prices)
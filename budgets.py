@@ -0,0 +1,232 @@
+import os
+import argparse
+import datetime as dt
+from pymongo import UpdateOne
+import mongo
+import versions
+
+# ===================== BUDGETS ===================== #
+
+# Monthly budgets kept up to date from ingested feed items instead of live balance calls.
+#
+#   budget_events:     one entry per feed item counted towards a budget (the event log), keyed by feedItemUid
+#   budget_state:      running spend per budget and month, one document each, so reading a budget is O(1)
+#   budget_allowances: allowance overrides, per budget ("groceries") or per budget and month ("groceries:2025-09")
+#
+# Every ingestion path ends in data.save_feed_items, which applies the items here. Re-applying an
+# item only moves the difference, so webhook redeliveries and overlapping syncs are harmless.
+EVENTS = "budget_events"
+STATE = "budget_state"
+ALLOWANCES = "budget_allowances"
+
+# `category` is where the money is spent from: "general" for the main account, otherwise a space name.
+# Items in an `exclude`d spendingCategory don't count.
+BUDGETS = {
+    "pocket_money": {
+        "allowance": float(os.getenv("POCKET_MONEY_ALLOWANCE", "200")),
+        "category": "general",
+        "exclude": ["INCOME", "REVENUE", "SAVING", "INVESTMENTS", "BILLS_AND_SERVICES", "TRANSFERS"],
+    },
+    "groceries": {
+        "allowance": float(os.getenv("GROCERIES_ALLOWANCE", "150")),
+        "category": "Groceries",
+        "exclude": ["INCOME", "SAVING", "TRANSFERS"],
+    },
+}
+
+# feed item statuses that never count
+IGNORED_STATUSES = ("DECLINED", "REVERSED")
+
+# money moved between my own account and spaces (e.g. topping up the Groceries space) is funding,
+# not spending or a refund, whatever spendingCategory it carries
+IGNORED_SOURCES = ("INTERNAL_TRANSFER",)
+
+
+def current_period():
+    return dt.datetime.now(dt.UTC).strftime("%Y-%m")
+
+
+def _period(item):
+    when = item.get("transactionAt")
+    return when.strftime("%Y-%m") if when else None
+
+
+def contribution(item, categories):
+    """
+    The event a feed item adds to the budgets: {budget, period, amountMinor} with
+    spending positive and refunds negative, or None if it doesn't count towards any budget.
+    `categories` maps category uids to "general" or a space name (see data.budget_categories).
+    """
+    if item.get("status") in IGNORED_STATUSES or item.get("source") in IGNORED_SOURCES or not _period(item):
+        return None
+
+    category = categories.get(item.get("categoryUid"))
+    for budget, config in BUDGETS.items():
+        if config["category"] != category or item.get("spendingCategory") in config.get("exclude", ()):
+            continue
+        amount = item["sourceAmount"]["minorUnits"]
+        return {
+            "budget": budget,
+            "period": _period(item),
+            "amountMinor": amount if item.get("direction") == "OUT" else -amount,
+        }
+    return None
+
+
+def _same(entry, event):
+    if entry is None or event is None:
+        return entry is None and event is None
+    return all(entry.get(k) == event[k] for k in ("budget", "period", "amountMinor"))
+
+
+def _state_update(event, sign, now):
+    return UpdateOne(
+        {"_id": f"{event['budget']}:{event['period']}"},
+        {
+            "$inc": {"spentMinor": sign * event["amountMinor"], "events": sign},
+            "$set": {"budget": event["budget"], "period": event["period"], "updatedAt": now},
+        },
+        upsert=True,
+    )
+
+
+def apply_items(items, categories):
+    """
+    Applies normalized feed items to the budgets. Returns the number of events added, changed or removed.
+    """
+    db = mongo.get_db()
+    events = {item["feedItemUid"]: contribution(item, categories) for item in items}
+    applied = {doc["_id"]: doc for doc in db[EVENTS].find({"_id": {"$in": list(events)}})}
+
+    now = dt.datetime.now(dt.UTC)
+    state_ops = []
+    for uid, event in events.items():
+        if _same(applied.get(uid), event):
+            continue  # already counted as it is, the common case for re-ingested items
+
+        # swap the log entry atomically, so an item ingested twice at once is still counted once
+        if event:
+            previous = db[EVENTS].find_one_and_replace({"_id": uid}, dict(event, appliedAt=now), upsert=True)
+        else:
+            previous = db[EVENTS].find_one_and_delete({"_id": uid})
+
+        if _same(previous, event):
+            continue
+        if previous:
+            state_ops.append(_state_update(previous, -1, now))
+        if event:
+            state_ops.append(_state_update(event, 1, now))
+
+    if state_ops:
+        db[STATE].bulk_write(state_ops, ordered=False)
+        versions.bump("budgets")
+
+    return len(state_ops)
+
+
+# ---------- ALLOWANCES ----------
+def set_allowance(budget, amount, period=None):
+    key = f"{budget}:{period}" if period else budget
+    mongo.get_db()[ALLOWANCES].update_one(
+        {"_id": key}, {"$set": {"budget": budget, "period": period, "allowance": float(amount)}}, upsert=True
+    )
+    versions.bump("budgets")
+
+
+def allowance(budget, period):
+    """
+    The month's own allowance, else the budget's, else the default from BUDGETS.
+    """
+    overrides = {
+        doc["_id"]: doc["allowance"]
+        for doc in mongo.get_db()[ALLOWANCES].find({"_id": {"$in": [f"{budget}:{period}", budget]}})
+    }
+    return overrides.get(f"{budget}:{period}", overrides.get(budget, BUDGETS[budget]["allowance"]))
+
+# ---------- READS ----------
+def status(budget, period=None):
+    """
+    (remaining, spent) in pounds, clamped to the allowance like the donuts always were.
+    """
+    period = period or current_period()
+    state = mongo.get_db()[STATE].find_one({"_id": f"{budget}:{period}"}) or {}
+    limit = allowance(budget, period)
+
+    remaining = min(max(limit - state.get("spentMinor", 0) / 100, 0), limit)
+    return round(remaining, 2), round(limit - remaining, 2)
+
+
+def history(budget, since=None):
+    """
+    Allowance, spend and what was left for every month the budget has events, oldest first.
+    """
+    query = {"budget": budget}
+    if since:
+        query["period"] = {"$gte": since}
+
+    rows = []
+    for state in mongo.get_db()[STATE].find(query).sort("period", 1):
+        limit = allowance(budget, state["period"])
+        spent = state["spentMinor"] / 100
+        rows.append({
+            "period": state["period"],
+            "allowance": limit,
+            "spent": round(spent, 2),
+            "remaining": round(limit - spent, 2),
+            "events": state["events"],
+        })
+    return rows
+
+
+def rebuild(items, categories):
+    """
+    Drops the event log and state and replays `items` (an iterable of stored feed items).
+    """
+    db = mongo.get_db()
+    db[EVENTS].delete_many({})
+    db[STATE].delete_many({})
+
+    batch, applied = [], 0
+    for item in items:
+        batch.append(item)
+        if len(batch) == 1000:
+            applied += apply_items(batch, categories)
+            batch = []
+    applied += apply_items(batch, categories) if batch else 0
+    versions.bump("budgets")
+    return applied
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Budget tools")
+    subparsers = parser.add_subparsers(dest="command", required=True)
+
+    set_parser = subparsers.add_parser("set", help="set a budget's allowance, for every month or one")
+    set_parser.add_argument("budget", choices=list(BUDGETS))
+    set_parser.add_argument("amount", type=float, help="allowance in pounds")
+    set_parser.add_argument("--period", help="YYYY-MM, default: every month without its own allowance")
+
+    show_parser = subparsers.add_parser("show", help="monthly budget performance")
+    show_parser.add_argument("budget", nargs="?", help="default: all budgets")
+    show_parser.add_argument("--since", help="first month, YYYY-MM")
+
+    subparsers.add_parser("rebuild", help="replay the local transactions store into the budgets")
+
+    args = parser.parse_args()
+    if args.command == "set":
+        set_allowance(args.budget, args.amount, args.period)
+        print(f"[budgets] {args.budget} allowance set to £{args.amount:,.2f}" + (f" for {args.period}" if args.period else ""))
+
+    elif args.command == "show":
+        for budget in [args.budget] if args.budget else BUDGETS:
+            print(f"\n{budget}")
+            for row in history(budget, args.since):
+                print(f"  {row['period']}  spent £{row['spent']:>9,.2f} of £{row['allowance']:>9,.2f}"
+                      f"  left £{row['remaining']:>9,.2f}  ({row['events']} transactions)")
+
+    elif args.command == "rebuild":
+        import data
+
+        stored = mongo.get_db()[data.TRANSACTIONS_COLLECTION].find({})
+        count = rebuild(stored, data.budget_categories())
+        print(f"[budgets] Rebuilt from the transactions store, {count} budget updates")
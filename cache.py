@@ -0,0 +1,149 @@
+import os
+import json
+import time
+import pickle
+import sqlite3
+import hashlib
+import threading
+import pandas as pd
+
+# ===================== SHARED CACHE ===================== #
+
+# one SQLite file shared by every worker process on the host
+CACHE_PATH = os.getenv("CACHE_PATH", "cache.sqlite3")
+CACHE_MAX_ENTRIES = int(os.getenv("CACHE_MAX_ENTRIES", "500"))
+
+
+class SharedCache:
+    """
+    Small pickle-in-SQLite key/value store with per-entry TTL, usable across gunicorn
+    workers. When it grows past max_entries the oldest entries are evicted.
+    """
+
+    def __init__(self, path=CACHE_PATH, max_entries=CACHE_MAX_ENTRIES):
+        self.path = path
+        self.max_entries = max_entries
+        self._local = threading.local()
+
+    def _connection(self):
+        # sqlite connections can't cross threads or a fork, so keep one per thread per process
+        conn = getattr(self._local, "conn", None)
+        if conn is None or self._local.pid != os.getpid():
+            conn = sqlite3.connect(self.path, timeout=5, isolation_level=None)
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute("PRAGMA synchronous=NORMAL")
+            conn.execute(
+                "CREATE TABLE IF NOT EXISTS cache ("
+                "key TEXT PRIMARY KEY, value BLOB NOT NULL, stored_at REAL NOT NULL, expires_at REAL NOT NULL)"
+            )
+            conn.execute("CREATE INDEX IF NOT EXISTS cache_stored_at ON cache (stored_at)")
+            self._local.conn = conn
+            self._local.pid = os.getpid()
+        return conn
+
+    def get(self, key, default=None):
+        try:
+            row = self._connection().execute(
+                "SELECT value FROM cache WHERE key = ? AND expires_at > ?", (key, time.time())
+            ).fetchone()
+        except sqlite3.Error as e:
+            print(f"[SharedCache] Read failed for {key}: {e}")
+            return default
+
+        return pickle.loads(row[0]) if row else default
+
+    def set(self, key, value, ttl):
+        now = time.time()
+        try:
+            conn = self._connection()
+            conn.execute(
+                "INSERT OR REPLACE INTO cache (key, value, stored_at, expires_at) VALUES (?, ?, ?, ?)",
+                (key, pickle.dumps(value, protocol=pickle.HIGHEST_PROTOCOL), now, now + ttl),
+            )
+            self._evict(conn, now)
+        except sqlite3.Error as e:
+            print(f"[SharedCache] Write failed for {key}: {e}")
+
+    def _evict(self, conn, now):
+        conn.execute("DELETE FROM cache WHERE expires_at <= ?", (now,))
+        conn.execute(
+            "DELETE FROM cache WHERE key IN ("
+            "SELECT key FROM cache ORDER BY stored_at DESC LIMIT -1 OFFSET ?)",
+            (self.max_entries,),
+        )
+
+    def get_or_set(self, key, ttl, compute):
+        """
+        Returns the cached value for key, computing and storing it on a miss.
+        """
+        missing = object()
+        value = self.get(key, missing)
+        if value is missing:
+            value = compute()
+            self.set(key, value, ttl)
+        return value
+
+
+shared_cache = SharedCache()
+
+# ===================== FIGURE CACHE ===================== #
+
+def data_version(source):
+    """
+    Stable hash of a panel's source data. DataFrames are hashed by content,
+    anything else through its JSON representation.
+    """
+    digest = hashlib.sha1()
+    _update_digest(digest, source)
+    return digest.hexdigest()
+
+
+def _update_digest(digest, value):
+    if isinstance(value, pd.DataFrame):
+        digest.update(json.dumps(list(map(str, value.columns))).encode())
+        digest.update(pd.util.hash_pandas_object(value, index=True).values.tobytes())
+    elif isinstance(value, (list, tuple)):
+        for item in value:
+            _update_digest(digest, item)
+            digest.update(b"|")
+    else:
+        digest.update(json.dumps(value, sort_keys=True, default=str).encode())
+
+
+# how long a built figure is kept in the shared cache
+FIGURE_TTL = int(os.getenv("FIGURE_CACHE_TTL", str(24 * 60 * 60)))
+
+
+class FigureCache:
+    """
+    Keeps the figure built for each panel, keyed by the version of its source data,
+    so a panel is only rebuilt when its data actually changed. Figures live in the
+    shared cache, so a figure built by one worker is reused by the others.
+    """
+
+    def __init__(self, store=shared_cache, ttl=FIGURE_TTL):
+        self._store = store
+        self._ttl = ttl
+        self._figures = {}  # last (version, figure) seen by this process, per panel
+        self._lock = threading.Lock()
+
+    def get_or_build(self, panel, source, build):
+        """
+        Returns (version, figure) for the panel, calling build(source) only on a version change.
+        """
+        version = data_version(source)
+
+        with self._lock:
+            cached = self._figures.get(panel)
+        if cached and cached[0] == version:
+            return cached
+
+        figure = self._store.get_or_set(f"figure:{panel}:{version}", self._ttl, lambda: build(source))
+        with self._lock:
+            self._figures[panel] = (version, figure)
+
+        return version, figure
+
+    def versions(self):
+        with self._lock:
+            return {panel: version for panel, (version, _) in self._figures.items()}
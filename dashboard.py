@@ -3,20 +3,46 @@ import pandas as pd
 from datetime import datetime
 from dotenv import load_dotenv
 import data
-import os
+import cache
+import metrics
+import payloads
+import profiling
+import versions
+import snapshots
+import webhook
+import dataflow
+import budgets
+import resilience
+import time
 import dash
-from dash import dcc, html, dash_table, Input, Output
+from dash import dcc, html, dash_table, Input, Output, State, no_update
 import plotly.graph_objs as go
-from pymongo import MongoClient
 
 # Load environment
 load_dotenv()
-mongo_uri = os.getenv("MONGO_URI_ONLINE")
-db_name = "finance_dashboard"
-client = MongoClient(mongo_uri)
-db = client[db_name]
 
 app = dash.Dash(__name__)
+server = app.server  # WSGI entry point for gunicorn, see wsgi.py
+metrics.init_app(app.server)  # Prometheus metrics on /metrics
+profiling.init_app(app.server)  # opt-in callback profiles, see profiling.py
+payloads.init_app(app.server)  # orjson encoding + br/gzip responses
+versions.init_app(app.server)  # dataset versions on /data-version
+webhook.init_app(app.server)  # Starling pushes on /webhooks/starling
+
+# last figure built per panel, keyed by a hash of its source data
+FIGURE_CACHE = cache.FigureCache()
+
+# panel id -> the dataset it's built from, and dataset -> the datasets it needs
+GRAPH = dataflow.DataGraph()
+
+PANEL_LABELS = {
+    "pocket-donut": "Pocket Money",
+    "groceries-donut": "Groceries",
+    "categories-bar": "Top Expenses",
+    "savings-line": "Savings Growth",
+    "net-worth-card": "Net Worth",
+    "portfolio-line": "Portfolio",
+}
 
 # ---------- GLOBAL DARK STYLE ----------
 DARK_BG = "#121212"
@@ -43,6 +69,10 @@ GRAPH_STYLE = {"backgroundColor": CARD_BG, "borderRadius": "20px", "padding": "2
 
 # ---------- LAYOUT ----------
 def dashboard():
+
+    # one run for the whole page, so panels sharing data fetch it once
+    run = GRAPH.run(stale_ok=True)
+
     return html.Div(
         style={
             "backgroundColor": DARK_BG,
@@ -60,6 +90,10 @@ def dashboard():
             dcc.Store(id='monthly-transactions-store'),
             dcc.Store(id='refresh-trigger'),
 
+            # auto-refresh: poll the dataset versions, refresh only when one changed
+            dcc.Store(id='data-version'),
+            dcc.Interval(id='version-poll', interval=versions.POLL_SECONDS * 1000),
+
             # HEADER ROW
             html.Div(
                 style={
@@ -78,8 +112,12 @@ def dashboard():
                             "maxWidth": "1800px",     # match all dashboard content width
                         },
                         children=[
-                            # Left spacer
-                            html.Div(style={"width": "80px"}),
+                            # how old the data on screen is (Left)
+                            html.Div(
+                                data_age_children(),
+                                id="data-age",
+                                style={"width": "260px", "fontSize": "13px"},
+                            ),
 
                             # TITLE
                             html.H1(
@@ -94,21 +132,35 @@ def dashboard():
                                 },
                             ),
 
-                            # Refresh Button (Right)
-                            html.Button(
-                                "Refresh",
-                                id="refresh-btn",
-                                n_clicks=0,
-                                style={
-                                    "backgroundColor": ACCENT,
-                                    "color": DARK_BG,
-                                    "border": "none",
-                                    "padding": "10px 16px",
-                                    "borderRadius": "6px",
-                                    "cursor": "pointer",
-                                    "fontSize": "14px",
-                                    "fontWeight": "600",
-                                },
+                            # Refresh Button (Right), with the panel(s) to refresh
+                            html.Div(
+                                [
+                                    dcc.Dropdown(
+                                        id="refresh-panel",
+                                        options=[{"label": "All panels", "value": "all"}]
+                                        + [{"label": label, "value": panel_id} for panel_id, label in PANEL_LABELS.items()],
+                                        value="all",
+                                        clearable=False,
+                                        searchable=False,
+                                        style={"width": "170px", "color": DARK_BG, "fontSize": "14px"},
+                                    ),
+                                    html.Button(
+                                        "Refresh",
+                                        id="refresh-btn",
+                                        n_clicks=0,
+                                        style={
+                                            "backgroundColor": ACCENT,
+                                            "color": DARK_BG,
+                                            "border": "none",
+                                            "padding": "10px 16px",
+                                            "borderRadius": "6px",
+                                            "cursor": "pointer",
+                                            "fontSize": "14px",
+                                            "fontWeight": "600",
+                                        },
+                                    ),
+                                ],
+                                style={"display": "flex", "gap": "10px", "alignItems": "center"},
                             ),
                         ],
                     )
@@ -118,9 +170,9 @@ def dashboard():
             # ---------- FIRST ROW ----------
             html.Div(
                 [
-                    html.Div(pocket_money_donut_chart(), style=GRAPH_STYLE),
-                    html.Div(groceries_donut_chart(), style=GRAPH_STYLE),
-                    html.Div(categories_bar(), style=GRAPH_STYLE),
+                    html.Div(pocket_money_donut_chart(run), style=GRAPH_STYLE),
+                    html.Div(groceries_donut_chart(run), style=GRAPH_STYLE),
+                    html.Div(categories_bar(run), style=GRAPH_STYLE),
                 ],
                 style={
                     "display": "grid",
@@ -135,10 +187,10 @@ def dashboard():
             # ---------- SECOND ROW ----------
             html.Div(
                 [
-                    html.Div(savings_line(), style=GRAPH_STYLE),
+                    html.Div(savings_line(run), style=GRAPH_STYLE),
 
                     html.Div(
-                        net_worth_card(),
+                        net_worth_card(run),
                         style={
                             "display": "flex",
                             "alignItems": "center",
@@ -148,7 +200,7 @@ def dashboard():
                         id='net-worth-card'
                     ),
 
-                    html.Div(portfolio_line(), style=GRAPH_STYLE),
+                    html.Div(portfolio_line(run), style=GRAPH_STYLE),
                 ],
                 style={
                     "display": "grid",
@@ -164,7 +216,7 @@ def dashboard():
             html.Div(
                 [
                     html.Div(
-                        transactions_table(),
+                        [date_range_picker("transactions-range"), transactions_table()],
                         style={
                             "width": "100%",
                             "maxWidth": "1800px",
@@ -177,6 +229,10 @@ def dashboard():
                     "justifyContent": "center",
                 },
             ),
+
+            # versions of the figures rendered above, so refreshes can skip unchanged panels.
+            # keep this last: the panels must be built before their versions are read
+            dcc.Store(id='figure-versions', data=FIGURE_CACHE.versions()),
         ],
     )
 
@@ -196,9 +252,79 @@ def dark_layout(fig, title):
     )
     return fig
 
+# ---------- PANEL DATA ----------
+# shared datasets are declared once and loaded at most once per refresh, see dataflow.py.
+# `sources` lists the versioned datasets (versions.py) that make a dataset stale,
+# `upstream` marks the ones served from their last good value while the API is refetched
+@GRAPH.dataset("accounts", upstream="starling")
+def accounts_data():
+    return data.StarlingAPI().get_accounts()
+
+# pocket money and groceries (remaining, spent): O(1) reads from the budget engine (budgets.py).
+# the budgets are fed by whatever ingests transactions (load_monthly_data on page load, manual
+# refreshes, sync, webhooks) and are only as complete as the store; until it covers the month
+# from the 1st, live balances are used instead
+@GRAPH.dataset("monthly_balance", deps=("accounts",), sources=("budgets", "transactions"), upstream="starling")
+def monthly_balance_data(accounts):
+    month_start, _ = current_month_range()
+    if data.covered_from(data.TRANSACTIONS_COLLECTION, month_start):
+        return budgets.status("pocket_money"), budgets.status("groceries")
+    return data.monthly_balance(accounts)
+
+@GRAPH.dataset("pocket_money", deps=("monthly_balance",))
+def pocket_money_data(balance):
+    pocket_money, _ = balance
+    return pocket_money
+
+@GRAPH.dataset("groceries", deps=("monthly_balance",))
+def groceries_data(balance):
+    _, groceries = balance
+    return groceries
+
+@GRAPH.dataset("savings_history", sources=("savings",), upstream="starling")
+def savings_history_data():
+    return data.savings_growth_history()
+
+@GRAPH.dataset("portfolio_history", sources=("snapshots", "investment_transactions"), upstream="trading212")
+def portfolio_history():
+
+    # add a snapshot to the DB today if not done so yet
+    today = dt.datetime.now(dt.timezone.utc).date()
+    latest = snapshots.latest(1)
+    latest_entry = latest[0] if latest else None
+
+    if latest_entry and latest_entry['timestampAdded'].date() < today:
+        data.snapshot(latest_entry)
+
+    # only the plotted fields, the holdings arrays aren't needed here
+    portfolio_df = pd.DataFrame(snapshots.history(fields=("netDeposit", "portfolioValue")))
+    portfolio_df["timestampAdded"] = pd.to_datetime(portfolio_df["timestampAdded"])
+
+    return portfolio_df
+
+@GRAPH.dataset("categories", deps=("accounts", "monthly_balance"), sources=("transactions",), upstream="starling")
+def categories_data(accounts, balance):
+    current_month = datetime.now().strftime("%B")
+    current_year = datetime.now().year
+    df = data.biggest_expenses_in_current_month(current_month, current_year, accounts, balance)
+    return current_month, current_year, df
+
+# depends on portfolio_history so today's snapshot is taken before the latest ones are read
+@GRAPH.dataset("net_worth", deps=("portfolio_history",), sources=("snapshots", "savings"))
+def net_worth_data(_):
+    entries = snapshots.latest(2, fields=("netWorth",))
+    return [entry.get("netWorth", 0) for entry in entries]
+
+def render_panel(panel_id, run):
+    """
+    Gets a panel's source data from the refresh run and returns its (version, figure),
+    rebuilding the figure only when the data changed since the last build.
+    """
+    _, build = GRAPH.panels[panel_id]
+    return FIGURE_CACHE.get_or_build(panel_id, run.panel_source(panel_id), build)
+
 # ---------- CHARTS ----------
-def pocket_money_donut_chart():
-    pocket_money, _ = data.monthly_balance()
+def pocket_money_figure(pocket_money):
     labels = ["Remaining", "Spent"]
     values = [pocket_money[0], pocket_money[1]]
     colors = ["#26A69A", "#EF5350"]
@@ -214,10 +340,13 @@ def pocket_money_donut_chart():
             )
         ]
     )
-    return dcc.Graph(figure=dark_layout(fig, "Pocket Money"), id='pocket-donut')
+    return dark_layout(fig, "Pocket Money")
+
+def pocket_money_donut_chart(run):
+    _, figure = render_panel("pocket-donut", run)
+    return dcc.Graph(figure=figure, id='pocket-donut')
 
-def groceries_donut_chart():
-    _, groceries = data.monthly_balance()
+def groceries_figure(groceries):
     labels = ["Remaining", "Spent"]
     values = [groceries[0], groceries[1]]
     colors = ["#26A69A", "#EF5350"]
@@ -233,10 +362,14 @@ def groceries_donut_chart():
             )
         ]
     )
-    return dcc.Graph(figure=dark_layout(fig, "Groceries"), id='groceries-donut')
+    return dark_layout(fig, "Groceries")
 
-def savings_line():
-    df = data.savings_growth_history()
+def groceries_donut_chart(run):
+    _, figure = render_panel("groceries-donut", run)
+    return dcc.Graph(figure=figure, id='groceries-donut')
+
+def savings_figure(df):
+    df = df.copy()
     df["display_date"] = pd.to_datetime(df["display_date"], format="%d/%m/%Y")
 
     fig = go.Figure(
@@ -249,27 +382,17 @@ def savings_line():
             hovertemplate="%{x|%b %Y}<br>Balance: £%{y:,.2f}<extra></extra>",
         )
     )
+    return dark_layout(fig, "Savings Growth")
+
+def savings_line(run):
+    _, figure = render_panel("savings-line", run)
     return dcc.Graph(
-        figure=dark_layout(fig, "Savings Growth"),
+        figure=figure,
         style={'height': '400px'},
         id="savings-line"
         )
 
-def portfolio_line():
-
-    # add a snapshot to the DB today if not done so yet
-    today = dt.datetime.now(dt.timezone.utc).date()
-    latest_entry = db['portfolio_value'].find_one(
-        sort=[('timestampAdded', -1)]
-    )
-
-    if latest_entry and latest_entry['timestampAdded'].date() < today:
-        data.snapshot(latest_entry)
-        print('this line ran')
-
-    portfolio_df = pd.DataFrame(list(db["portfolio_value"].find().sort("timestampAdded", 1)))
-    portfolio_df["timestampAdded"] = pd.to_datetime(portfolio_df["timestampAdded"])
-
+def portfolio_figure(portfolio_df):
     fig = go.Figure()
     fig.add_trace(
         go.Scatter(
@@ -291,17 +414,21 @@ def portfolio_line():
             marker=dict(size=8, color="#FFA726", line=dict(width=2, color="black")),
         )
     )
+    return dark_layout(fig, "Portfolio Performance")
+
+def portfolio_line(run):
+    _, figure = render_panel("portfolio-line", run)
     return dcc.Graph(
-        figure=dark_layout(
-            fig, "Portfolio Performance"),
-            style={'height': '400px'},
-            id='portfolio-line'
-            )
+        figure=figure,
+        style={'height': '400px'},
+        id='portfolio-line'
+        )
 
-def categories_bar():
-    current_month = datetime.now().strftime("%B")
-    current_year = datetime.now().year
-    df = data.biggest_expenses_in_current_month(current_month, current_year)
+def categories_figure(source):
+    current_month, current_year, df = source
+    return category_bar_figure(df, f"Top Expenses in {current_month} {current_year}")
+
+def category_bar_figure(df, title):
     df = df[df["Direction"] == "OUT"].sort_values("Total Expenditure", ascending=True)
 
     fig = go.Figure(
@@ -318,25 +445,80 @@ def categories_bar():
         )
     )
 
-    return dcc.Graph(
-        figure=dark_layout(
-            fig, 
-            f"Top Expenses in {current_month} {current_year}"
-            ), 
-            id='categories-bar'
-        )
+    return dark_layout(fig, title)
 
-# ---------- KPI CARD ----------
-def net_worth_card():
-    coll = db["portfolio_value"]
+def categories_bar(run):
+    _, figure = render_panel("categories-bar", run)
+    return html.Div(
+        [
+            date_range_picker("categories-range"),
+            dcc.Graph(figure=figure, id='categories-bar'),
+        ]
+    )
 
-    entries = list(coll.find().sort("timestampAdded", -1).limit(2))
-    if not entries:
+# ---------- DATE RANGES ----------
+def current_month_range():
+    today = dt.date.today()
+    return today.replace(day=1), today
+
+def is_current_month(start_date, end_date):
+    return (pd.Timestamp(start_date).date(), pd.Timestamp(end_date).date()) == current_month_range()
+
+def categories_range_figure(start_date, end_date):
+    """
+    (version, figure) of the category chart for a picked range, read from the local store.
+    """
+    # totals are aggregated in Mongo, only one row per category comes back
+    data.fill_transactions_store(start_date, end_date)
+    df = data.stored_category_totals(start_date, end_date)
+    start, end = pd.Timestamp(start_date), pd.Timestamp(end_date)
+    title = f"Top Expenses {start:%d/%m/%Y} - {end:%d/%m/%Y}"
+
+    version = f"range:{start:%Y-%m-%d}:{end:%Y-%m-%d}:{cache.data_version(df)}"
+    figure = cache.shared_cache.get_or_set(f"figure:categories-{version}", cache.FIGURE_TTL, lambda: category_bar_figure(df, title))
+    return version, figure
+
+def date_range_picker(picker_id):
+    # defaults to the current month, earlier ranges are served from the local transaction store
+    start, end = current_month_range()
+    return dcc.DatePickerRange(
+        id=picker_id,
+        start_date=start,
+        end_date=end,
+        max_date_allowed=end,
+        display_format="DD/MM/YYYY",
+        first_day_of_week=1,
+        minimum_nights=0,
+        style={"marginBottom": "10px", "fontSize": "14px"},
+    )
+
+# ---------- DATA AGE ----------
+# warn once the oldest API data on screen is older than this
+DATA_AGE_WARN_SECONDS = 15 * 60
+
+def data_age_children():
+    oldest = GRAPH.fetched_at(GRAPH.panels)
+    down = resilience.open_circuits()
+    if not oldest and not down:
+        return ""
+
+    parts = []
+    warn = bool(down)
+    if oldest:
+        parts.append(f"Data as of {datetime.fromtimestamp(oldest):%d/%m %H:%M}")
+        warn = warn or time.time() - oldest > DATA_AGE_WARN_SECONDS
+    if down:
+        parts.append(f"{', '.join(name.title() for name in down)} unavailable")
+
+    return html.Span(" · ".join(parts), style={"color": "#FFA726" if warn else "#888"})
+
+# ---------- KPI CARD ----------
+def net_worth_children(net_worths):
+    if not net_worths:
         return html.Div("No Data Available", style=CARD_STYLE)
 
-    latest, prev = entries[0], entries[1] if len(entries) > 1 else None
-    net_worth = latest.get("netWorth", 0)
-    change = net_worth - (prev.get("netWorth", 0) if prev else 0)
+    net_worth = net_worths[0]
+    change = net_worth - (net_worths[1] if len(net_worths) > 1 else 0)
     trend_color = "#66BB6A" if change >= 0 else "#EF5350"
 
     return html.Div(
@@ -356,6 +538,10 @@ def net_worth_card():
         }
     )
 
+def net_worth_card(run):
+    _, children = render_panel("net-worth-card", run)
+    return children
+
 # ---------- TRANSACTIONS TABLE ----------
 def transactions_table():
 
@@ -460,26 +646,27 @@ def refresh_button():
 # ---------- CALLBACKS ----------
 @app.callback(
     Output("monthly-transactions-store", "data"),
-    Input("monthly-transactions-store", "data"),
+    Input("transactions-range", "start_date"),
+    Input("transactions-range", "end_date"),
     prevent_initial_call=False  # run on page load
 )
-def load_monthly_data(_):
+@metrics.timed_callback("load_monthly_data")
+def load_monthly_data(start_date, end_date):
 
-    today = dt.datetime.today()
-    start_date = today.replace(day=1)
-    end_date = (today.replace(day=1) + pd.DateOffset(months=1)) - pd.DateOffset(days=1)
+    if not (start_date and end_date):
+        start_date, end_date = current_month_range()
 
-    start = f"{start_date.day}/{start_date.month}/{start_date.year}"
-    end = f"{end_date.day}/{end_date.month}/{end_date.year}"
-
-    df = data.transactions(start, end)
+    # fetch what the local store doesn't cover yet (always the current month), then an
+    # indexed range query: any range costs about the same as a month
+    data.fill_transactions_store(start_date, end_date)
+    df = data.stored_transactions(start_date, end_date)
 
     # convert datetimes
     for col in df.columns:
         if pd.api.types.is_datetime64_any_dtype(df[col]):
             df[col] = df[col].dt.strftime("%d/%m/%Y %H:%M")
 
-    return df.to_dict("records")
+    return payloads.encode_frame(df)
 
 @app.callback(
     Output('transactions-table', 'data'),
@@ -489,11 +676,13 @@ def load_monthly_data(_):
         Input('monthly-transactions-store', 'data')
     ]
 )
+@metrics.timed_callback("update_table")
 def update_table(bar_click, relayout, store_data):
 
     if store_data is None:
         return []
 
+    # the store may be column- or row-oriented, see payloads.STORE_ORIENT
     df = pd.DataFrame(store_data)
     filtered = df.copy()
 
@@ -509,23 +698,51 @@ def update_table(bar_click, relayout, store_data):
 
     return filtered.to_dict("records")
 
-# Map component IDs → their generator functions
-REFRESH_MAP = {
-    "pocket-donut": lambda: pocket_money_donut_chart().figure,
-    "groceries-donut": lambda: groceries_donut_chart().figure,
-    "savings-line": lambda: savings_line().figure,
-    "portfolio-line": lambda: portfolio_line().figure,
-    "categories-bar": lambda: categories_bar().figure,
-    "net-worth-card": lambda: net_worth_card(),   # returns children, not figure
-}
+@app.callback(
+    Output("categories-bar", "figure", allow_duplicate=True),
+    Output("figure-versions", "data", allow_duplicate=True),
+    Input("categories-range", "start_date"),
+    Input("categories-range", "end_date"),
+    State("figure-versions", "data"),
+    prevent_initial_call=True,
+)
+@metrics.timed_callback("update_categories_range")
+def update_categories_range(start_date, end_date, client_versions):
+    if not (start_date and end_date):
+        return no_update, no_update
+
+    # back to the current month: the regular panel
+    if is_current_month(start_date, end_date):
+        version, figure = render_panel("categories-bar", GRAPH.run(stale_ok=True))
+    else:
+        version, figure = categories_range_figure(start_date, end_date)
+
+    # recorded so refreshes keep the picked range instead of overwriting it
+    return figure, dict(client_versions or {}, **{"categories-bar": version})
+
+# Map component IDs → (source dataset, figure builder)
+GRAPH.panel("pocket-donut", "pocket_money", pocket_money_figure)
+GRAPH.panel("groceries-donut", "groceries", groceries_figure)
+GRAPH.panel("savings-line", "savings_history", savings_figure)
+GRAPH.panel("portfolio-line", "portfolio_history", portfolio_figure)
+GRAPH.panel("categories-bar", "categories", categories_figure)
+GRAPH.panel("net-worth-card", "net_worth", net_worth_children)   # returns children, not figure
+
+# order must match the refresh_all outputs
+PANEL_IDS = list(GRAPH.panels)
 
 @app.callback(
     Output("refresh-trigger", "data"),
     Input("refresh-btn", "n_clicks"),
+    State("refresh-panel", "value"),
     prevent_initial_call=True
 )
-def trigger_refresh(_):
-    return {"timestamp": datetime.now().isoformat()}
+def trigger_refresh(_, panel):
+    # a manual refresh waits for fresh data, page loads and polls don't
+    trigger = {"timestamp": datetime.now().isoformat(), "manual": True}
+    if panel and panel != "all":
+        trigger["panels"] = [panel]
+    return trigger
     
 
 @app.callback(
@@ -536,16 +753,73 @@ def trigger_refresh(_):
         Output("portfolio-line", "figure"),
         Output("categories-bar", "figure"),
         Output("net-worth-card", "children"),
+        Output("figure-versions", "data"),
+        Output("data-version", "data", allow_duplicate=True),
+        Output("data-age", "children"),
     ],
     Input("refresh-trigger", "data"),
+    State("figure-versions", "data"),
+    State("categories-range", "start_date"),
+    State("categories-range", "end_date"),
+    prevent_initial_call='initial_duplicate',
 )
-def refresh_all(_):
-    results = [fn() for fn in REFRESH_MAP.values()]
-    return results
+@metrics.timed_callback("refresh_all")
+def refresh_all(trigger, client_versions, categories_start, categories_end):
+    client_versions = client_versions or {}
+    trigger = trigger or {}
+
+    # a single panel from the dropdown, the panels depending on datasets the poll saw change, or everything
+    if "panels" in trigger:
+        wanted = set(trigger["panels"])
+    elif "changed" in trigger:
+        wanted = set(GRAPH.affected(trigger["changed"]))
+    else:
+        wanted = set(PANEL_IDS)
+
+    # the category chart shows whatever range its picker is on
+    picked_range = bool(categories_start and categories_end) and not is_current_month(categories_start, categories_end)
+
+    # a manual refresh pulls this month's new transactions once, which bumps the budgets the run reads
+    if trigger.get("manual"):
+        data.fill_transactions_store(*current_month_range())
+
+    # panels whose data hasn't changed since the browser last got them are left untouched
+    run = GRAPH.run(stale_ok=not trigger.get("manual"))
+    results, figure_versions = [], dict(client_versions)
+    for panel_id in PANEL_IDS:
+        if panel_id not in wanted:
+            results.append(no_update)
+            continue
+
+        if panel_id == "categories-bar" and picked_range:
+            version, figure = categories_range_figure(categories_start, categories_end)
+        else:
+            version, figure = render_panel(panel_id, run)
+        figure_versions[panel_id] = version
+        results.append(no_update if client_versions.get(panel_id) == version else figure)
+
+    # the refresh itself may have ingested new data; record that so the poll doesn't refresh again
+    return results + [figure_versions, versions.current(), data_age_children()]
+
+@app.callback(
+    Output("refresh-trigger", "data", allow_duplicate=True),
+    Output("data-version", "data", allow_duplicate=True),
+    Input("version-poll", "n_intervals"),
+    State("data-version", "data"),
+    prevent_initial_call=True,
+)
+@metrics.timed_callback("poll_data_version")
+def poll_data_version(_, known_versions):
+    latest = versions.current()
+    if known_versions is None or not versions.changed(known_versions, latest):
+        return no_update, no_update
+
+    return {"timestamp": datetime.now().isoformat(), "changed": versions.changed(known_versions, latest)}, latest
 
 
 # ---------- APP LAYOUT ----------
-app.layout = dashboard()
+# a function, so every page load gets today's picker range and the latest panels
+app.layout = dashboard
 
 if __name__ == "__main__":
     app.run(debug=True)
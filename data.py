@@ -1,12 +1,25 @@
 import os
 import json
 import time
+import argparse
+import fx
+import cache
+import mongo
+import versions
+import snapshots
+import backfill
+import budgets
+import metrics
+import resilience
 import requests
+import numpy as np
 import pandas as pd
 import datetime as dt
 from pathlib import Path
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
 from dotenv import load_dotenv
-from pymongo import MongoClient
+from pymongo import ReplaceOne, UpdateOne
 from datetime import datetime, timedelta
 
 # ===================== CREDENTIALS ===================== #
@@ -14,19 +27,24 @@ from datetime import datetime, timedelta
 load_dotenv()  # Loads variables from .env into the environment
 api_username = os.getenv("INVESTMENT_API_KEY")
 api_password = os.getenv("INVESTMENT_API_SECRET")
-mongo_uri = os.getenv("MONGO_URI_ONLINE")  
-db_name = "finance_dashboard"
+# base URLs can point at local stand-ins, see loadtest.py
+TRADING212_BASE_URL = os.getenv("TRADING212_BASE_URL", "https://live.trading212.com")
+STARLING_BASE_URL = os.getenv("STARLING_BASE_URL", "https://api.starlingbank.com/api/v2")
 
-# initialize mongoDB
-client = MongoClient(mongo_uri)
-db = client[db_name]
+# seconds an upstream GET response is reused by every worker (see cache.SharedCache)
+API_CACHE_TTL = int(os.getenv("API_CACHE_TTL", "60"))
+ACCOUNTS_CACHE_TTL = 60 * 60  # account uids practically never change
+
+# long feed ranges are fetched as windows of this many days, this many windows at a time
+FEED_WINDOW_DAYS = int(os.getenv("FEED_WINDOW_DAYS", "30"))
+FEED_WORKERS = int(os.getenv("FEED_WORKERS", "4"))
 
 class StarlingAPI:
     def __init__(self, max_retries=3, backoff=2):
         # API token environment variable
         TOKEN = os.getenv("PAYMENT_TOKEN")
 
-        self.base_url = "https://api.starlingbank.com/api/v2"
+        self.base_url = STARLING_BASE_URL
         self.headers = {
             "Authorization": f"Bearer {TOKEN}",
             "Accept": "application/json"
@@ -34,23 +52,42 @@ class StarlingAPI:
         self.max_retries = max_retries
         self.backoff = backoff
 
-    def _request(self, method, endpoint, **kwargs):
+    def _request(self, method, endpoint, cache_ttl=None, **kwargs):
         """
         Internal helper method to make API requests with retry logic.
+        With cache_ttl set, the response is shared through the cross-process cache.
         """
+        if cache_ttl:
+            key = f"starling:{method}:{endpoint}:{json.dumps(kwargs.get('params'), sort_keys=True)}"
+            return cache.shared_cache.get_or_set(
+                key, cache_ttl, lambda: self._request(method, endpoint, **kwargs)
+            )
+
         url = f"{self.base_url}{endpoint}"
+        endpoint_label = metrics.endpoint_label(endpoint)
+        breaker = resilience.breakers["starling"]
 
         for attempt in range(1, self.max_retries + 1):
+            # fail fast while Starling is known to be down, instead of waiting out timeouts and backoffs
+            breaker.check()
             try:
-                response = requests.request(
-                    method, url, headers=self.headers, timeout=10, **kwargs
-                )
-                response.raise_for_status()  
+                with metrics.track(metrics.STARLING_LATENCY, endpoint=endpoint_label) as labels:
+                    response = requests.request(
+                        method, url, headers=self.headers, timeout=10, **kwargs
+                    )
+                    labels["status"] = response.status_code
+                    response.raise_for_status()  
 
-                return response.json()  
+                    result = response.json()
+                    breaker.record_success()
+                    return result
 
             except (requests.exceptions.RequestException, ValueError) as e:
                 print(f"[StarlingAPI] Attempt {attempt} failed: {e}")
+                if resilience.is_outage(e):
+                    breaker.record_failure()
+                else:
+                    breaker.record_success()  # upstream answered, the request itself was bad
 
                 # re-raise on final failure
                 if attempt == self.max_retries:
@@ -60,11 +97,11 @@ class StarlingAPI:
 
     # get account data
     def get_accounts(self):
-        return self._request("GET", "/accounts")
+        return self._request("GET", "/accounts", cache_ttl=ACCOUNTS_CACHE_TTL)
 
     # get specified account balance 
     def get_balance(self, account_uid):
-        return self._request("GET", f"/accounts/{account_uid}/balance")
+        return self._request("GET", f"/accounts/{account_uid}/balance", cache_ttl=API_CACHE_TTL)
 
     # get transaction statement between specified times
     def get_transaction_statement(self, account_uid, category_uid, start_date, end_date):
@@ -77,6 +114,54 @@ class StarlingAPI:
         data = self._request("GET", url, params=params)
         return data.get("feedItems", [])
 
+    def iter_transaction_windows(self, account_uid, category_uids, start, end=None,
+                                 window_days=FEED_WINDOW_DAYS, max_workers=FEED_WORKERS):
+        """
+        Streams the feed items between start and end (default: now) as
+        (window_start, window_end, items), oldest window first. Windows are fetched
+        max_workers at a time, so only those are ever held in memory.
+        """
+        windows = feed_windows(start, end, window_days)
+
+        def fetch(window):
+            items = []
+            for category_uid in category_uids:
+                items.extend(self.get_transaction_statement(
+                    account_uid, category_uid, starling_iso(window[0]), starling_iso(window[1])
+                ))
+            return [normalize_feed_item(item, account_uid) for item in items]
+
+        with ThreadPoolExecutor(max_workers=max_workers) as pool:
+            remaining = iter(windows)
+            pending = deque()
+            for window in remaining:
+                pending.append((window, pool.submit(fetch, window)))
+                if len(pending) == max_workers:
+                    break
+
+            try:
+                while pending:
+                    window, future = pending.popleft()
+                    items = future.result()
+
+                    # keep max_workers requests in flight while the caller handles this window
+                    upcoming = next(remaining, None)
+                    if upcoming:
+                        pending.append((upcoming, pool.submit(fetch, upcoming)))
+
+                    yield window[0], window[1], items
+            finally:
+                # caller stopped early
+                for _, future in pending:
+                    future.cancel()
+
+    def iter_transactions(self, account_uid, category_uids, start, end=None, **kwargs):
+        """
+        Same as iter_transaction_windows, one feed item at a time.
+        """
+        for _, _, items in self.iter_transaction_windows(account_uid, category_uids, start, end, **kwargs):
+            yield from items
+
     # categories like "bills", "Eating out" etc
     def get_monthly_categories(self, account_uid, year, month):
 
@@ -84,31 +169,276 @@ class StarlingAPI:
         params = {"year": year, "month": month}
 
         # return the .json response
-        return self._request("GET", f"/accounts/{account_uid}/spending-insights/spending-category", params=params)
+        return self._request("GET", f"/accounts/{account_uid}/spending-insights/spending-category", cache_ttl=API_CACHE_TTL, params=params)
     
     # get savings spaces
     def get_savings_spaces(self, accountUid):
 
         url = f'/account/{accountUid}/spaces'
         
-        return self._request('GET', url)
+        return self._request('GET', url, cache_ttl=API_CACHE_TTL)
     
     def get_spending_space(self, accountUid, spaceUid):
 
         url = f'/account/{accountUid}/spaces/spending/{spaceUid}'
 
-        return self._request('GET', url)
+        return self._request('GET', url, cache_ttl=API_CACHE_TTL)
+
+# ===================== LOCAL STORE ===================== #
+
+# Starling feed items kept locally, keyed by feedItemUid:
+#   transactions: main account (general category plus the Groceries and Bills spaces)
+#   savings:      savings account
+TRANSACTIONS_COLLECTION = "transactions"
+SAVINGS_COLLECTION = "savings"
+
+def parse_timestamp(value):
+    """
+    Starling timestamps, e.g. 2025-07-01T09:30:00.000Z, as naive UTC datetimes
+    """
+    if not value:
+        return None
+    return pd.to_datetime(value, utc=True).tz_localize(None).to_pydatetime()
+
+def starling_iso(day):
+    return day.strftime("%Y-%m-%dT%H:%M:%S.000Z")
+
+def feed_windows(start, end=None, window_days=FEED_WINDOW_DAYS):
+    """
+    Consecutive (start, end) windows of at most window_days covering start to end (default: now), as naive UTC.
+    """
+    start = pd.to_datetime(start, utc=True).tz_localize(None)
+    end = pd.to_datetime(end, utc=True).tz_localize(None) if end is not None else pd.Timestamp.now(tz="UTC").tz_localize(None)
+
+    bounds = list(pd.date_range(start, end, freq=f"{window_days}D")) + [end]
+    return [(a, b) for a, b in zip(bounds, bounds[1:]) if a < b]
+
+def normalize_feed_item(item, account_uid=None):
+    """
+    Feed item as stored locally: keyed by feedItemUid, tagged with its account and a
+    queryable copy of the transaction time.
+    """
+    doc = dict(item, _id=item["feedItemUid"])
+    if account_uid and "accountUid" not in doc:
+        doc["accountUid"] = account_uid
+    doc["transactionAt"] = parse_timestamp(item.get("transactionTime"))
+    return doc
+
+# statuses left out of spending totals
+EXCLUDED_STATUSES = ["DECLINED", "REVERSED"]
+
+_indexed = set()
+
+def ensure_store_indexes(collection_name):
+    """
+    Indexes backing the date-range queries. Created once per process.
+    """
+    if collection_name in _indexed:
+        return
+    coll = mongo.get_db()[collection_name]
+    coll.create_index("transactionAt")
+    coll.create_index([("spendingCategory", 1), ("transactionAt", 1)])
+    _indexed.add(collection_name)
+
+def save_feed_items(collection_name, items):
+    """
+    Upserts feed items into a local store. Re-sending an item is a no-op, and an item
+    that changed upstream (e.g. pending -> settled) is replaced. Returns the number of
+    new or changed items.
+    """
+    if not items:
+        return 0
+    ensure_store_indexes(collection_name)
+
+    docs = [normalize_feed_item(item) for item in items]
+    ops = [ReplaceOne({"_id": doc["_id"]}, doc, upsert=True) for doc in docs]
+
+    result = mongo.get_db()[collection_name].bulk_write(ops, ordered=False)
+    changed = result.upserted_count + result.modified_count
+    if changed:
+        versions.bump(collection_name)
+
+    # main account spending feeds the budgets. applied even when nothing changed here,
+    # so items a failed earlier attempt missed get counted
+    if collection_name == TRANSACTIONS_COLLECTION:
+        try:
+            budgets.apply_items(docs, budget_categories())
+        except Exception as e:
+            print(f"[save_feed_items] Budgets not updated, run `python budgets.py rebuild` if this persists: {e}")
+
+    return changed
+
+def budget_categories():
+    """
+    Category uid -> "general" for the main account's default category, or the space's name
+    """
+    api = StarlingAPI()
+    accounts = api.get_accounts()['accounts']
+    spaces = api.get_savings_spaces(accounts[0]['accountUid'])['savingsGoals']
+
+    categories = {space['savingsGoalUid']: space['name'] for space in spaces}
+    categories[accounts[0]['defaultCategory']] = "general"
+    return categories
+
+def _day_bounds(start_date, end_date):
+    # whole days, end inclusive
+    start = pd.Timestamp(start_date).normalize()
+    end = pd.Timestamp(end_date).normalize() + pd.Timedelta(days=1)
+    return start.to_pydatetime(), end.to_pydatetime()
+
+# ---------- COVERAGE ----------
+# Webhooks store single items, so a store having items doesn't make a range complete.
+# The ranges fully fetched into a store are kept on its sync checkpoint (see SYNC) as "covered".
+
+def _merge_ranges(ranges):
+    merged = []
+    for start, end in sorted((pd.Timestamp(a).to_pydatetime(), pd.Timestamp(b).to_pydatetime()) for a, b in ranges):
+        if merged and start <= merged[-1][1]:
+            merged[-1][1] = max(merged[-1][1], end)
+        else:
+            merged.append([start, end])
+    return merged
+
+def record_coverage(collection_name, start, end):
+    """
+    Marks start to end (naive UTC) as fully fetched into a local store. A concurrent
+    writer can drop the other's range, which only means it's fetched again later.
+    """
+    covered = get_checkpoint(collection_name).get("covered", [])
+    save_checkpoint(collection_name, covered=_merge_ranges(covered + [[start, end]]))
+
+def uncovered_ranges(collection_name, start, end):
+    """
+    The parts of start to end (naive UTC) a local store doesn't cover, oldest first. The
+    current month never counts as covered, its items can still settle or be reversed.
+    """
+    month_start = pd.Timestamp.now(tz="UTC").tz_localize(None).normalize().replace(day=1).to_pydatetime()
+    start, end = pd.Timestamp(start).to_pydatetime(), pd.Timestamp(end).to_pydatetime()
+
+    gaps, cursor = [], start
+    for covered_start, covered_end in _merge_ranges(get_checkpoint(collection_name).get("covered", [])):
+        covered_end = min(covered_end, month_start)
+        if covered_start >= covered_end or covered_end <= cursor:
+            continue
+        if covered_start >= end:
+            break
+        if covered_start > cursor:
+            gaps.append((cursor, covered_start))
+        cursor = covered_end
+        if cursor >= end:
+            break
+
+    if cursor < end:
+        gaps.append((cursor, end))
+    return gaps
+
+def covered_from(collection_name, start):
+    """
+    Whether a local store has been fully fetched from `start` (naive UTC) onwards, up to some later point.
+    """
+    start = pd.Timestamp(start).to_pydatetime()
+    return any(a <= start < b for a, b in _merge_ranges(get_checkpoint(collection_name).get("covered", [])))
+
+def fill_transactions_store(start_date, end_date):
+    """
+    Fetches the part of a date range (inclusive) the transactions store doesn't cover yet,
+    which always includes the current month. If Starling fails, the store is used as it is.
+    """
+    start, end = _day_bounds(start_date, end_date)
+    end = min(end, pd.Timestamp.now(tz="UTC").tz_localize(None).to_pydatetime())
+    gaps = uncovered_ranges(TRANSACTIONS_COLLECTION, start, end) if start < end else []
+    if not gaps:
+        return
+
+    api = StarlingAPI()
+    try:
+        _, accountUid, category_uids = feed_categories(api, "transactions")
+        for gap_start, gap_end in gaps:
+            for window_start, window_end, items in api.iter_transaction_windows(accountUid, category_uids, gap_start, gap_end):
+                save_feed_items(TRANSACTIONS_COLLECTION, items)
+                record_coverage(TRANSACTIONS_COLLECTION, window_start, window_end)
+    except Exception as e:
+        print(f"[fill_transactions_store] Serving stored transactions only, fetch failed: {e}")
+
+def stored_transactions(start_date, end_date):
+    """
+    Main account transactions between two dates (inclusive) from the local store,
+    in the same format as transactions().
+    """
+    start, end = _day_bounds(start_date, end_date)
+    projection = {
+        "_id": 0, "transactionAt": 1, "counterPartyName": 1, "spendingCategory": 1,
+        "sourceAmount": 1, "direction": 1,
+    }
+    cursor = mongo.get_db()[TRANSACTIONS_COLLECTION].find(
+        {"transactionAt": {"$gte": start, "$lt": end}}, projection
+    ).sort("transactionAt", 1)
+
+    rows = [
+        {
+            'Date': tx['transactionAt'].strftime("%d/%m/%Y"),
+            'Counter Party Name': tx.get('counterPartyName'),
+            'Category': tx['spendingCategory'].replace('_', ' ').title(),
+            'Amount': tx['sourceAmount']['minorUnits']/100,
+            'Currency': tx['sourceAmount']['currency'],
+            'Direction': tx['direction'],
+        }
+        for tx in cursor
+    ]
+    return pd.DataFrame(rows, columns=['Date', 'Counter Party Name', 'Category', 'Amount', 'Currency', 'Direction'])
+
+def stored_category_totals(start_date, end_date):
+    """
+    Net spend per category between two dates (inclusive), aggregated in Mongo from the
+    local store. Same columns as biggest_expenses_in_current_month().
+    """
+    start, end = _day_bounds(start_date, end_date)
+    signed_amount = {
+        "$cond": [
+            {"$eq": ["$direction", "IN"]},
+            "$sourceAmount.minorUnits",
+            {"$multiply": [-1, "$sourceAmount.minorUnits"]},
+        ]
+    }
+    pipeline = [
+        {"$match": {"transactionAt": {"$gte": start, "$lt": end}, "status": {"$nin": EXCLUDED_STATUSES}}},
+        {"$group": {"_id": "$spendingCategory", "net": {"$sum": signed_amount}}},
+    ]
+
+    rows = [
+        {
+            'Category': row['_id'].title().replace("_", " "),
+            'Total Expenditure': abs(row['net'])/100,
+            'Direction': 'OUT' if row['net'] < 0 else 'IN',
+        }
+        for row in mongo.get_db()[TRANSACTIONS_COLLECTION].aggregate(pipeline)
+        if row['_id']
+    ]
+    category_df = pd.DataFrame(rows, columns=['Category', 'Total Expenditure', 'Direction'])
+    category_df = category_df[~category_df['Category'].isin(['Saving', 'Investments'])]
+
+    return category_df.sort_values(by=["Direction", "Total Expenditure"], ascending=[False, False])
+
+# which local store an account's feed items belong to
+def store_for_account(account_uid):
+    accounts = StarlingAPI().get_accounts()['accounts']
+    if account_uid == accounts[0]['accountUid']:
+        return TRANSACTIONS_COLLECTION
+    if account_uid == accounts[1]['accountUid']:
+        return SAVINGS_COLLECTION
+    return None
 
 # ===================== BANK API ===================== #
 
 # define a function for the monthly pocket money and groceries expenses
-def monthly_balance():
+# accounts / spaces can be passed in when the caller already fetched them (see dataflow.py)
+def monthly_balance(accounts=None, spaces=None):
 
     # call the API class
     api = StarlingAPI()
 
     # account data
-    account_data = api.get_accounts()
+    account_data = accounts or api.get_accounts()
     accountUid = account_data['accounts'][0]['accountUid']
 
     def pocket_money():
@@ -134,8 +464,8 @@ def monthly_balance():
 
         #groceries_allowance = 12000 # in minorUnits
 
-        spaces = api.get_savings_spaces(accountUid)['savingsGoals']
-        for space in spaces:
+        savings_goals = (spaces or api.get_savings_spaces(accountUid))['savingsGoals']
+        for space in savings_goals:
             if space['name'] == 'Groceries':
                 grocery_space = space
                 break
@@ -159,7 +489,7 @@ def savings_growth_history():
     """
 
     api = StarlingAPI()
-    collection = db['savings']
+    collection = mongo.get_db()['savings']
 
     # Get accounts
     accounts_data = api.get_accounts()
@@ -178,44 +508,33 @@ def savings_growth_history():
         start_date = (today - timedelta(days=90)).strftime("%Y-%m-%dT%H:%M:%S.%fZ")
 
     end_date = today.strftime("%Y-%m-%dT%H:%M:%S.%fZ")
-    transactions = api.get_transaction_statement(
-        savings_accountUid,
-        savings_categoryUid,
-        start_date,
-        end_date
-    )
-    
-    # assign feedItemUid as _id
-    for tx in transactions:
-        tx["_id"] = tx["feedItemUid"]
 
-    # insert ignoring duplicates
-    if transactions:
-        existing_ids_cursor = collection.find(
-            {"_id": {"$in": [t["_id"] for t in transactions]}},
-            {"_id": 1}
-        )
-        existing_ids = {doc["_id"] for doc in existing_ids_cursor}
-        new_transactions = [t for t in transactions if t["_id"] not in existing_ids] if False else [t for t in transactions if t["_id"] not in existing_ids]
-        if new_transactions:
-            try:
-                collection.insert_many(new_transactions)
-            except Exception as e:
-                print(f"[savings_growth_history] Failed to insert transactions: {e}")
+    # fetched in parallel windows, a first run covers the whole history. each window is
+    # stored as it arrives and only the columns the chart needs are kept
+    rows = []
+    windows = api.iter_transaction_windows(savings_accountUid, [savings_categoryUid], start_date, end_date)
+    for _, _, items in windows:
 
-    # Create DataFrame
-    df = pd.DataFrame(transactions)
-    df = df[['direction', 'amount', 'spendingCategory', 'settlementTime']]
+        # upsert keyed by feedItemUid, duplicates are ignored
+        try:
+            save_feed_items(SAVINGS_COLLECTION, items)
+        except Exception as e:
+            print(f"[savings_growth_history] Failed to insert transactions: {e}")
 
-    # keep datetime for calculations
+        rows.extend(
+            {
+                'amount': item['amount']['minorUnits'] / 100 * (-1 if item['direction'] == 'OUT' else 1),
+                'settlementTime': item.get('settlementTime'),
+            }
+            for item in items
+        )
+
+    # Create DataFrame, keeping datetime for calculations
+    df = pd.DataFrame(rows, columns=['amount', 'settlementTime'])
     df['settlementTime'] = pd.to_datetime(df['settlementTime'])
-    df['amount'] = df.apply(
-        lambda x: x['amount']['minorUnits'] / 100 * (-1 if x['direction'] == 'OUT' else 1),
-        axis=1
-    )
     
-    # reverse order for chronological
-    df = df.iloc[::-1].reset_index(drop=True)
+    # chronological (each window comes back newest first)
+    df = df.sort_values('settlementTime', kind='stable', na_position='last').reset_index(drop=True)
     df['display_date'] = df['settlementTime'].dt.strftime('%d/%m/%Y')
 
     # Compute cumulative change
@@ -228,23 +547,24 @@ def savings_growth_history():
     return df
 
 # function to return the biggest expenses in the month 
-def biggest_expenses_in_current_month(month, year):
+def biggest_expenses_in_current_month(month, year, accounts=None, balance=None):
     """
     Returns a DataFrame of the largest spending categories for the given month and year,
     including money spent from the 'Groceries' savings space.
+    accounts / balance (monthly_balance()) can be passed in when already fetched.
     """
 
     api = StarlingAPI()
 
     # Get accounts
-    accounts_data = api.get_accounts()
+    accounts_data = accounts or api.get_accounts()
     accountUid = accounts_data['accounts'][0]['accountUid']
 
     # Get categories for the month
     categoryUid = api.get_monthly_categories(accountUid, int(year), month.upper())
 
     # get the amount spent on groceries
-    _, groceries = monthly_balance()
+    _, groceries = balance or monthly_balance(accounts_data)
     groceries_spent = groceries[1]
 
     if len(categoryUid['breakdown']) == 0 and groceries_spent == 0:
@@ -366,15 +686,38 @@ def transactions(start_date, end_date):
 
 # ===================== TRADING212 API ===================== #
 
+# GET a Trading212 path, recording latency by endpoint and status
+def trading212_get(path, cache_ttl=None):
+
+    if cache_ttl:
+        return cache.shared_cache.get_or_set(f"trading212:{path}", cache_ttl, lambda: trading212_get(path))
+
+    breaker = resilience.breakers["trading212"]
+    breaker.check()
+
+    url = TRADING212_BASE_URL + path
+    try:
+        with metrics.track(metrics.TRADING212_LATENCY, endpoint=metrics.endpoint_label(path)) as labels:
+            response = requests.get(url, auth=(api_username, api_password), timeout=10)
+            labels["status"] = response.status_code
+            response.raise_for_status()
+
+            result = response.json()
+    except requests.exceptions.RequestException as e:
+        if resilience.is_outage(e):
+            breaker.record_failure()
+        else:
+            breaker.record_success()
+        raise
+
+    breaker.record_success()
+    return result
+
 # get current portfolio data
 def portfolio():
     
-    url = "https://live.trading212.com/api/v0/equity/portfolio"
-    response = requests.get(url, auth=(api_username, api_password))
-    response.raise_for_status()
-    
     # Data is guaranteed to be the list of instruments from the API call
-    data = response.json()
+    data = trading212_get("/api/v0/equity/portfolio", cache_ttl=API_CACHE_TTL)
     
     # Add timestamp to each instrument
     for instrument in data:
@@ -384,11 +727,10 @@ def portfolio():
 
 # get historical transactions from the last year
 def investment_transactions():
-    base_url = "https://live.trading212.com"
     endpoint = "/api/v0/equity/history/orders"
     current_path = endpoint
     all_orders = []
-    transaction_coll = db['investment_transactions']
+    transaction_coll = mongo.get_db()['investment_transactions']
 
     # Only set a cutoff date if the collection is empty
     three_months_ago = None
@@ -396,10 +738,7 @@ def investment_transactions():
         three_months_ago = datetime.now() - timedelta(days=30 * 3)  # 3 months back
 
     while current_path:
-        url = base_url + current_path
-        response = requests.get(url, auth=(api_username, api_password))
-        response.raise_for_status()
-        data = response.json()
+        data = trading212_get(current_path)
 
         if "items" in data and isinstance(data["items"], list):
             should_stop = False
@@ -448,14 +787,14 @@ def investment_transactions():
 
         if new_orders:
             transaction_coll.insert_many(new_orders)
+            versions.bump("investment_transactions")
 
     save_to_mongo(all_orders)
 
 # net deposit must be saved every day, so that net P/L can be tracked per day.
 def portfolio_performance():
 
-    transaction_coll = db["investment_transactions"]
-    conversion_rate_usd_to_gbp = 0.75  # update if needed
+    transaction_coll = mongo.get_db()["investment_transactions"]
 
     # save any new transactions to DB
     investment_transactions()
@@ -487,25 +826,18 @@ def portfolio_performance():
 
     # ------------------------------ #
 
-    # get current portfolio value
+    # get current portfolio value, converting USD and pence quotes with today's FX rates
     portfolio_data = portfolio()
+    now = dt.datetime.now(dt.timezone.utc)
 
-    portfolio_value = 0
-    for ins in portfolio_data:
-        ticker = ins['ticker']
-        current_price = ins['currentPrice']
-        shares = ins['quantity']
+    tickers = [ins['ticker'] for ins in portfolio_data]
+    quantities = np.array([ins['quantity'] for ins in portfolio_data], dtype=float)
+    prices = np.array([ins['currentPrice'] for ins in portfolio_data], dtype=float)
+    prices_gbp = prices * fx.fx_rates.gbp_multipliers(tickers, now)
 
-        if "_US_" in ticker:
-            current_price *= conversion_rate_usd_to_gbp
-        elif "SGLNl_EQ" in ticker:
-            current_price /= 100
+    portfolio_value = round(float(np.dot(quantities, prices_gbp)), 2)
 
-        portfolio_value += shares * current_price
-
-    portfolio_value = round(portfolio_value, 2)
-
-    # today's latest snapshot
+    # today's latest snapshot. the quoted price is kept so the snapshot can be repriced later (fx.py)
     insert_dict = {
         'netDeposit': round(net_deposit,2),
         'portfolioValue': round(portfolio_value, 2),
@@ -513,14 +845,12 @@ def portfolio_performance():
             {
                 'ticker': ins['ticker'],
                 'quantity': ins['quantity'],
-                'priceGBP': round(
-                    ins['currentPrice'] * conversion_rate_usd_to_gbp if "_US_" in ins['ticker'] else
-                    ins['currentPrice'] / 100 if "SGLNl_EQ" in ins['ticker'] else
-                    ins['currentPrice'], 2
-                )
-            } for ins in portfolio_data
+                'currentPrice': ins['currentPrice'],
+                'currency': fx.instrument_currency(ins['ticker']),
+                'priceGBP': round(float(price_gbp), 2)
+            } for ins, price_gbp in zip(portfolio_data, prices_gbp)
         ],
-        'timestampAdded': dt.datetime.now(dt.timezone.utc)
+        'timestampAdded': now
     }
 
     return insert_dict
@@ -528,8 +858,7 @@ def portfolio_performance():
 # portfolio + networth snapshot 
 def snapshot(latest_entry):
 
-    portfolio_coll = db['portfolio_value']
-    savings_coll = db['savings']
+    savings_coll = mongo.get_db()['savings']
 
     # get savings data 
     savings_data = list(savings_coll.find())
@@ -547,19 +876,209 @@ def snapshot(latest_entry):
     snapshot = portfolio_performance()
     snapshot['savingsTotal'] = round(savings_value, 2)
     snapshot['netWorth'] = round(savings_value + snapshot['portfolioValue'], 2)
+    snapshot['snapshotDate'] = snapshot['timestampAdded'].strftime("%Y-%m-%d")
 
-    # save to mongodb
-    portfolio_coll.insert_one(snapshot)
-    
-    snapshot['timestampAdded'] = str(snapshot['timestampAdded'])
-    snapshot['_id'] = str(snapshot['_id'])
-    print(f'Snapshot of {snapshot['timestampAdded']} Inserted to DB')
+    # save to mongodb, one snapshot per day, so concurrent first loads of the day don't duplicate it
+    inserted = snapshots.save(snapshot)
+
+    if inserted:
+        print(f'Snapshot of {snapshot['timestampAdded']} Inserted to DB')
+    else:
+        print(f'Snapshot of {snapshot["snapshotDate"]} already in DB, skipped')
 
-    return snapshot
+    return inserted
 
-# ===================== EXECUTION SCRIPT ===================== #
-#if __name__ == "__main__":
+# ===================== SYNC ===================== #
 
-#    pass
+# Headless ingestion: `python -m data sync [savings] [transactions] [orders] [snapshots]`.
+# Every source keeps a checkpoint in sync_checkpoints, so an interrupted sync resumes where it stopped.
+CHECKPOINT_COLLECTION = "sync_checkpoints"
+SYNC_SOURCES = ("savings", "transactions", "orders", "snapshots")
 
-    
+# first day fetched when a feed source has never been synced
+SYNC_START = os.getenv("SYNC_START", "2025-07-01")
+# re-read this far behind the checkpoint, pending items can still settle or be reversed
+SYNC_OVERLAP_DAYS = 7
+# Trading212 allows 6 order history requests a minute
+ORDERS_PAGE_PAUSE = float(os.getenv("SYNC_ORDERS_PAUSE", "10"))
+
+def get_checkpoint(source):
+    return mongo.get_db()[CHECKPOINT_COLLECTION].find_one({"_id": source}) or {}
+
+def save_checkpoint(source, **fields):
+    fields["updatedAt"] = dt.datetime.now(dt.UTC)
+    mongo.get_db()[CHECKPOINT_COLLECTION].update_one({"_id": source}, {"$set": fields}, upsert=True)
+
+def feed_categories(api, source):
+    """
+    (store, account uid, category uids) a feed source is read from
+    """
+    accounts = api.get_accounts()['accounts']
+
+    if source == "savings":
+        return SAVINGS_COLLECTION, accounts[1]['accountUid'], [accounts[1]['defaultCategory']]
+
+    # main account: general category plus the Groceries and Bills spaces, as in transactions()
+    accountUid = accounts[0]['accountUid']
+    spaces = api.get_savings_spaces(accountUid)['savingsGoals']
+    space_uids = [s['savingsGoalUid'] for s in spaces if s['name'] in ("Groceries", "Bills")]
+    return TRANSACTIONS_COLLECTION, accountUid, [accounts[0]['defaultCategory']] + space_uids
+
+def _new_items(collection_name, items):
+    ids = [item["feedItemUid"] for item in items]
+    existing = {doc["_id"] for doc in mongo.get_db()[collection_name].find({"_id": {"$in": ids}}, {"_id": 1})}
+    return len(set(ids) - existing)
+
+def sync_feed(source, since=None, dry_run=False, window_days=FEED_WINDOW_DAYS):
+    """
+    Streams a Starling feed into its local store one window at a time, checkpointing after each.
+    Returns the number of new or changed items.
+    """
+    api = StarlingAPI()
+    store, accountUid, category_uids = feed_categories(api, source)
+
+    checkpoint = get_checkpoint(source)
+    if since:
+        start = pd.Timestamp(since)
+    elif checkpoint.get("until"):
+        start = pd.Timestamp(checkpoint["until"]) - pd.Timedelta(days=SYNC_OVERLAP_DAYS)
+    else:
+        start = pd.Timestamp(SYNC_START)
+
+    now = pd.Timestamp.now(tz="UTC").tz_localize(None)
+    total = len(feed_windows(start, now, window_days))
+    stream = api.iter_transaction_windows(accountUid, category_uids, start, now, window_days=window_days)
+
+    written = 0
+    for i, (window_start, window_end, items) in enumerate(stream, 1):
+        if dry_run:
+            count = _new_items(store, items) if items else 0
+            label = "new"
+        else:
+            count = save_feed_items(store, items)
+            save_checkpoint(source, until=window_end.isoformat())
+            record_coverage(store, window_start, window_end)
+            label = "new/changed"
+        written += count
+
+        print(f"[sync] {source} {window_start.date()} to {window_end.date()}: "
+              f"{len(items)} items, {count} {label} ({i}/{total})")
+
+    return written
+
+def _order_created(order):
+    return order.get('dateCreated') or order.get('order', {}).get('createdAt')
+
+def sync_orders(dry_run=False):
+    """
+    Pages through the Trading212 order history into investment_transactions.
+    The first sync walks the whole history, checkpointing the next page so it can resume;
+    later syncs stop once they reach orders older than the newest one already stored.
+    """
+    coll = mongo.get_db()['investment_transactions']
+    checkpoint = get_checkpoint("orders")
+    complete = checkpoint.get("complete", False)
+    newest = checkpoint.get("newest")
+
+    path = "/api/v0/equity/history/orders" if complete else checkpoint.get("nextPagePath") or "/api/v0/equity/history/orders"
+    cutoff = parse_timestamp(newest) - timedelta(days=SYNC_OVERLAP_DAYS) if complete and newest else None
+
+    written, pages = 0, 0
+    while path:
+        page = trading212_get(path)
+        pages += 1
+
+        orders, reached_cutoff = [], False
+        for order in page.get("items", []):
+            created = _order_created(order)
+            if cutoff and created and parse_timestamp(created) < cutoff:
+                reached_cutoff = True
+                break
+            if created and (newest is None or parse_timestamp(created) > parse_timestamp(newest)):
+                newest = created
+
+            order["transaction_type"] = order['order']['side']
+            order["id"] = order['order']['id']
+            orders.append(order)
+
+        if dry_run:
+            ids = [o["id"] for o in orders]
+            count = len(set(ids) - {d["id"] for d in coll.find({"id": {"$in": ids}}, {"id": 1})})
+        elif orders:
+            result = coll.bulk_write(
+                [UpdateOne({"id": o["id"]}, {"$setOnInsert": o}, upsert=True) for o in orders], ordered=False
+            )
+            count = result.upserted_count
+        else:
+            count = 0
+        written += count
+        print(f"[sync] orders page {pages}: {len(orders)} orders, {count} new")
+
+        path = None if reached_cutoff else page.get("nextPagePath")
+        if not dry_run:
+            save_checkpoint(
+                "orders",
+                nextPagePath=path,
+                complete=complete or path is None,
+                newest=newest,
+            )
+        if path:
+            time.sleep(ORDERS_PAGE_PAUSE)
+
+    if written and not dry_run:
+        versions.bump("investment_transactions")
+    return written
+
+def sync_snapshots(since=None, dry_run=False):
+    """
+    Backfills missing daily snapshots, then takes today's if it hasn't been taken yet.
+    """
+    written = backfill.backfill(since=since, dry_run=dry_run)
+
+    latest = snapshots.latest(1)
+    today = dt.datetime.now(dt.UTC).date()
+    if latest and latest[0]['timestampAdded'].date() >= today:
+        print("[sync] snapshots: today's snapshot already taken")
+    elif dry_run:
+        print("[sync] snapshots: would take today's snapshot")
+    elif snapshot(latest[0] if latest else None):
+        written += 1
+    else:
+        print("[sync] snapshots: today's snapshot was taken meanwhile")
+
+    if not dry_run:
+        save_checkpoint("snapshots", until=today.isoformat())
+    return written
+
+def sync(sources=SYNC_SOURCES, since=None, dry_run=False, window_days=FEED_WINDOW_DAYS):
+    results = {}
+    for source in sources:
+        started = time.perf_counter()
+        if source in ("savings", "transactions"):
+            results[source] = sync_feed(source, since, dry_run, window_days)
+        elif source == "orders":
+            results[source] = sync_orders(dry_run)
+        elif source == "snapshots":
+            results[source] = sync_snapshots(since, dry_run)
+        print(f"[sync] {source} done in {time.perf_counter() - started:.1f}s: {results[source]} written"
+              + (" (dry run)" if dry_run else ""))
+    return results
+
+# ===================== EXECUTION SCRIPT ===================== #
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(prog="python -m data", description="Finance dashboard data tools")
+    subparsers = parser.add_subparsers(dest="command", required=True)
+
+    sync_parser = subparsers.add_parser("sync", help="pull history into MongoDB without the dashboard")
+    sync_parser.add_argument("sources", nargs="*", metavar="source",
+                             help=f"any of {', '.join(SYNC_SOURCES)} (default: everything)")
+    sync_parser.add_argument("--since", help="re-sync from this day, YYYY-MM-DD (default: resume from the checkpoint)")
+    sync_parser.add_argument("--window-days", type=int, default=FEED_WINDOW_DAYS, help="days fetched per Starling request")
+    sync_parser.add_argument("--dry-run", action="store_true", help="fetch and report without writing")
+
+    args = parser.parse_args()
+    if args.command == "sync":
+        unknown = set(args.sources) - set(SYNC_SOURCES)
+        if unknown:
+            sync_parser.error(f"unknown source(s): {', '.join(sorted(unknown))}")
+        sync(args.sources or SYNC_SOURCES, args.since, args.dry_run, args.window_days)
@@ -0,0 +1,206 @@
+import os
+import time
+import threading
+from concurrent.futures import ThreadPoolExecutor
+import cache
+import metrics
+import versions
+
+# ===================== PANEL DATAFLOW ===================== #
+
+# Panels declare which datasets they are built from, and datasets declare which other
+# datasets they need. A refresh then walks only the part of the graph the requested panels
+# depend on, computing every shared dataset (accounts, spaces, monthly balance...) once.
+#
+# Datasets fetched from an upstream API keep their last good value on disk, with the versions
+# of the datasets it was built from. Page loads are served that value straight away and
+# revalidate it in the background (stale-while-revalidate) unless one of those versions has
+# moved since, in which case it's reloaded; a failed fetch falls back to it.
+
+# last good values survive restarts and are shared by all workers
+LAST_GOOD_PATH = os.getenv("LAST_GOOD_PATH", "last_good.sqlite3")
+LAST_GOOD_TTL = 30 * 24 * 60 * 60
+
+# served values older than this are revalidated in the background
+STALE_AFTER_SECONDS = int(os.getenv("STALE_AFTER_SECONDS", "60"))
+
+# version bumped (see versions.py) when a background revalidation brings new data
+LIVE_PREFIX = "live:"
+
+# when each last good value was fetched, kept apart so reading it doesn't unpickle the value
+FETCHED_AT_PREFIX = "fetched_at:"
+
+last_good = cache.SharedCache(LAST_GOOD_PATH)
+
+_revalidator = ThreadPoolExecutor(max_workers=2, thread_name_prefix="revalidate")
+_revalidating = set()
+_revalidating_lock = threading.Lock()
+
+
+class DataGraph:
+    """
+    Named datasets plus the panels built from them.
+    """
+
+    def __init__(self):
+        self.nodes = {}   # dataset -> (loader, deps, sources, upstream)
+        self.panels = {}  # panel id -> (dataset, builder)
+
+    def dataset(self, name, deps=(), sources=(), upstream=None):
+        """
+        Decorator registering a dataset loader. The loader is called with the values of
+        `deps` in order. `sources` are the versioned datasets (see versions.py) whose
+        changes make this dataset stale. `upstream` names the API it calls (see
+        resilience.py), which makes it served stale-while-revalidate.
+        """
+        def register(loader):
+            self.nodes[name] = (loader, tuple(deps), tuple(sources), upstream)
+            return loader
+        return register
+
+    def panel(self, panel_id, dataset, build):
+        self.panels[panel_id] = (dataset, build)
+
+    def upstream(self, name):
+        """
+        The dataset and everything it depends on, directly or not.
+        """
+        seen, stack = set(), [name]
+        while stack:
+            node = stack.pop()
+            if node not in seen:
+                seen.add(node)
+                stack.extend(self.nodes[node][1])
+        return seen
+
+    def affected(self, changed):
+        """
+        Panels that depend on any of the `changed` versioned datasets.
+        """
+        changed = set(changed)
+        return [
+            panel_id for panel_id, (dataset, _) in self.panels.items()
+            if any(changed & {*self.nodes[node][2], LIVE_PREFIX + node} for node in self.upstream(dataset))
+        ]
+
+    def source_keys(self, name):
+        """
+        Versioned datasets a dataset's value is built from: its own and its dependencies'
+        sources, plus background refreshes of its dependencies.
+        """
+        keys = set()
+        for node in self.upstream(name):
+            keys.update(self.nodes[node][2])
+            if node != name:
+                keys.add(LIVE_PREFIX + node)
+        return keys
+
+    def fetched_at(self, panel_ids):
+        """
+        When the oldest upstream data behind the panels was last fetched, None if there is none yet.
+        """
+        nodes = set()
+        for panel_id in panel_ids:
+            nodes |= self.upstream(self.panels[panel_id][0])
+
+        times = [
+            fetched for node in nodes
+            if self.nodes[node][3] and (fetched := last_good.get(FETCHED_AT_PREFIX + node))
+        ]
+        return min(times) if times else None
+
+    def run(self, stale_ok=False):
+        return Run(self, stale_ok)
+
+
+class Run:
+    """
+    One refresh pass over a DataGraph. Datasets are loaded lazily and memoised, so a
+    dataset shared by several panels is fetched once per run.
+
+    With stale_ok, upstream datasets come from their last good value when there is one
+    and the datasets it was built from haven't changed since.
+    """
+
+    def __init__(self, graph, stale_ok=False):
+        self.graph = graph
+        self.stale_ok = stale_ok
+        self.values = {}
+        self._loading = set()
+        self._versions = None
+
+    def source_versions(self, name):
+        # read once per run, before anything is loaded, so a change made during the run reloads next time
+        if self._versions is None:
+            self._versions = versions.current()
+        return {key: self._versions.get(key) for key in sorted(self.graph.source_keys(name))}
+
+    def get(self, name):
+        if name in self.values:
+            return self.values[name]
+        if name in self._loading:
+            raise ValueError(f"Dependency cycle through dataset '{name}'")
+
+        loader, deps, _, upstream = self.graph.nodes[name]
+        stored = last_good.get(name) if upstream else None
+        source_versions = self.source_versions(name) if upstream else None
+
+        # a last good value built from data that has changed since is a miss, however recent
+        if stored and self.stale_ok and len(stored) == 3 and stored[2] == source_versions:
+            value, fetched_at, _ = stored
+            if time.time() - fetched_at > STALE_AFTER_SECONDS:
+                revalidate(self.graph, name)
+        else:
+            try:
+                value = self._load(name, loader, deps)
+                if upstream:
+                    fetched_at = time.time()
+                    last_good.set(name, (value, fetched_at, source_versions), LAST_GOOD_TTL)
+                    last_good.set(FETCHED_AT_PREFIX + name, fetched_at, LAST_GOOD_TTL)
+            except Exception as e:
+                if not stored:
+                    raise
+                print(f"[dataflow] {name} failed ({e}), serving last good data")
+                value = stored[0]
+
+        self.values[name] = value
+        return value
+
+    def _load(self, name, loader, deps):
+        self._loading.add(name)
+        try:
+            args = [self.get(dep) for dep in deps]
+            with metrics.track(metrics.DATASET_LATENCY, dataset=name):
+                return loader(*args)
+        finally:
+            self._loading.discard(name)
+
+    def panel_source(self, panel_id):
+        dataset, _ = self.graph.panels[panel_id]
+        return self.get(dataset)
+
+
+def revalidate(graph, name):
+    """
+    Refetches a dataset in the background, once per process at a time. Open dashboards
+    pick the new value up through the version poll.
+    """
+    with _revalidating_lock:
+        if name in _revalidating:
+            return
+        _revalidating.add(name)
+
+    def work():
+        try:
+            before = last_good.get(name)
+            run = Run(graph)
+            value = run.get(name)
+            if before is None or cache.data_version(before[0]) != cache.data_version(value):
+                versions.bump(LIVE_PREFIX + name)
+        except Exception as e:
+            print(f"[dataflow] Background refresh of {name} failed: {e}")
+        finally:
+            with _revalidating_lock:
+                _revalidating.discard(name)
+
+    _revalidator.submit(work)
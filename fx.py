@@ -0,0 +1,182 @@
+import os
+import argparse
+import threading
+import numpy as np
+import pandas as pd
+from pathlib import Path
+import snapshots
+
+# ===================== FX RATES ===================== #
+
+# CSV with columns date,pair,rate e.g. 2025-07-01,USDGBP,0.7301
+FX_RATES_PATH = Path(os.getenv("FX_RATES_PATH", "fx_rates.csv"))
+
+# stand-in provider: used for any pair/date the rates file can't answer
+STANDIN_RATES = {
+    "USDGBP": float(os.getenv("FX_USDGBP_STANDIN", "0.75")),
+}
+
+# conversions applied to snapshots taken before FX rates were stored, used to recover quoted prices
+LEGACY_RATES = {"USD": 0.75, "GBX": 0.01, "GBP": 1.0}
+
+# Trading212 instruments quoted in pence rather than pounds
+PENCE_TICKERS = {"SGLNl_EQ"}
+
+
+def instrument_currency(ticker):
+    """
+    Quote currency of a Trading212 ticker: USD, GBX (pence) or GBP.
+    """
+    if "_US_" in ticker:
+        return "USD"
+    if ticker in PENCE_TICKERS:
+        return "GBX"
+    return "GBP"
+
+
+class FXRateStore:
+    """
+    Daily FX rates keyed by date and currency pair, held in memory as a
+    date x pair DataFrame. Dates without a quote (weekends, holidays) use the last
+    known rate; anything before the first quote falls back to the stand-in rates.
+    """
+
+    def __init__(self, path=FX_RATES_PATH, standin=STANDIN_RATES):
+        self.path = Path(path)
+        self.standin = dict(standin)
+        self._table = None
+        self._lock = threading.Lock()
+
+    def _load(self):
+        if self.path.exists():
+            rows = pd.read_csv(self.path, parse_dates=["date"])
+            table = rows.pivot_table(index="date", columns="pair", values="rate", aggfunc="last")
+            return table.sort_index()
+
+        print(f"[FXRateStore] {self.path} not found, using stand-in rates")
+        return pd.DataFrame(index=pd.DatetimeIndex([], name="date"))
+
+    def table(self):
+        if self._table is None:
+            with self._lock:
+                if self._table is None:
+                    self._table = self._load()
+        return self._table
+
+    def reload(self):
+        with self._lock:
+            self._table = None
+
+    def rates(self, pair, dates):
+        """
+        Vectorised lookup: array of `pair` rates for each of `dates`.
+        """
+        # Mongo hands back naive UTC datetimes, so naive and aware inputs are both read as UTC
+        dates = pd.DatetimeIndex(pd.to_datetime(dates, utc=True)).tz_localize(None).normalize()
+        table = self.table()
+
+        if pair in table.columns:
+            series = table[pair].dropna()
+            rates = series.reindex(dates, method="ffill").to_numpy(dtype=float, copy=True)
+        else:
+            rates = np.full(len(dates), np.nan)
+
+        missing = np.isnan(rates)
+        if missing.any():
+            if pair not in self.standin:
+                raise KeyError(f"No FX rate available for {pair}")
+            rates[missing] = self.standin[pair]
+
+        return rates
+
+    def rate(self, pair, date):
+        return float(self.rates(pair, [date])[0])
+
+    def gbp_multipliers(self, tickers, dates):
+        """
+        Multiplier turning each instrument's quoted price into GBP on the given date(s).
+        """
+        currencies = np.array([instrument_currency(t) for t in tickers], dtype="U3")
+        dates = pd.to_datetime(dates, utc=True)
+        if isinstance(dates, pd.Timestamp):
+            dates = pd.DatetimeIndex([dates] * len(currencies))
+
+        multipliers = np.ones(len(currencies))
+        multipliers[currencies == "GBX"] = 0.01
+
+        usd = currencies == "USD"
+        if usd.any():
+            multipliers[usd] = self.rates("USDGBP", dates[usd])
+
+        return multipliers
+
+
+fx_rates = FXRateStore()
+
+# ===================== PORTFOLIO REVALUATION ===================== #
+
+def revalue_snapshots(store=fx_rates, dry_run=False):
+    """
+    Reprices the holdings of every stored snapshot with the FX rate of its own
+    day and rewrites priceGBP, portfolioValue and netWorth.
+
+    All holdings of all snapshots are flattened into one set of arrays, so the
+    repricing is a single NumPy pass regardless of how much history there is.
+    """
+    docs = list(snapshots.holdings_docs(extra_fields=("savingsTotal",)))
+    if not docs:
+        print("[revalue_snapshots] No snapshots to revalue")
+        return 0
+
+    # ---------- flatten holdings ----------
+    counts = np.array([len(doc["portfolio"]) for doc in docs])
+    holdings = [h for doc in docs for h in doc["portfolio"]]
+    doc_index = np.repeat(np.arange(len(docs)), counts)
+
+    tickers = [h["ticker"] for h in holdings]
+    quantity = np.array([h["quantity"] for h in holdings], dtype=float)
+    dates = pd.to_datetime([doc["timestampAdded"] for doc in docs], utc=True)[doc_index]
+
+    # newer snapshots keep the quoted price; older ones only have priceGBP at the legacy rate
+    currencies = np.array([instrument_currency(t) for t in tickers], dtype="U3")
+    legacy = np.array([LEGACY_RATES[c] for c in currencies])
+    quoted = np.array([h.get("currentPrice", np.nan) for h in holdings], dtype=float)
+    stored_gbp = np.array([h.get("priceGBP", np.nan) for h in holdings], dtype=float)
+    quoted = np.where(np.isnan(quoted), stored_gbp / legacy, quoted)
+
+    # ---------- reprice ----------
+    price_gbp = quoted * store.gbp_multipliers(tickers, dates)
+    portfolio_values = np.round(
+        np.bincount(doc_index, weights=np.nan_to_num(quantity * price_gbp), minlength=len(docs)), 2
+    )
+    price_gbp = np.round(price_gbp, 2)
+
+    # ---------- write back ----------
+    prices_per_doc = np.split(price_gbp, np.cumsum(counts)[:-1])
+    updates = []
+    for doc, prices, value in zip(docs, prices_per_doc, portfolio_values):
+        portfolio = [
+            dict(h, priceGBP=None if np.isnan(p) else float(p)) for h, p in zip(doc["portfolio"], prices)
+        ]
+        update = {"_id": doc["_id"], "portfolio": portfolio, "portfolioValue": float(value)}
+        if doc.get("snapshotDate"):
+            update["snapshotDate"] = doc["snapshotDate"]
+        if doc.get("savingsTotal") is not None:
+            update["netWorth"] = round(doc["savingsTotal"] + float(value), 2)
+        updates.append(update)
+
+    if dry_run:
+        print(f"[revalue_snapshots] Would update {len(updates)} snapshots")
+        return len(updates)
+
+    count = snapshots.update_many(updates)
+    print(f"[revalue_snapshots] Revalued {count} snapshots")
+    return count
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Reprice stored portfolio snapshots with historical FX rates")
+    parser.add_argument("--dry-run", action="store_true", help="compute but don't write")
+    args = parser.parse_args()
+
+    revalue_snapshots(dry_run=args.dry_run)
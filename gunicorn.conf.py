@@ -0,0 +1,12 @@
+import os
+
+# ===================== GUNICORN SETTINGS ===================== #
+
+bind = os.getenv("BIND", "0.0.0.0:8050")
+workers = int(os.getenv("WEB_CONCURRENCY", "4"))
+threads = int(os.getenv("GUNICORN_THREADS", "2"))
+
+# callbacks can wait on several slow bank API calls
+timeout = int(os.getenv("GUNICORN_TIMEOUT", "120"))
+
+accesslog = "-"
@@ -0,0 +1,144 @@
+import numpy as np
+import pandas as pd
+import fx
+import mongo
+import snapshots
+
+# ===================== HOLDINGS RECONSTRUCTION ===================== #
+
+def _order_date(order):
+    fill = order.get("fill") or {}
+    return fill.get("filledAt") or order.get("dateCreated") or order.get("order", {}).get("createdAt")
+
+
+def load_orders():
+    """
+    Filled orders from investment_transactions as a flat DataFrame:
+    date, ticker, quantity (negative for sells) and netValue (cash in/out of the portfolio).
+    """
+    coll = mongo.get_db()["investment_transactions"]
+    projection = {"_id": 0, "order": 1, "fill": 1, "dateCreated": 1, "transaction_type": 1}
+
+    rows = []
+    for order in coll.find({}, projection):
+        fill = order.get("fill") or {}
+        details = order.get("order") or {}
+        quantity = fill.get("quantity", details.get("filledQuantity"))
+        date = _order_date(order)
+        if not quantity or not date:
+            continue  # cancelled / unfilled orders
+
+        sign = -1 if order.get("transaction_type", details.get("side")) == "SELL" else 1
+        rows.append({
+            "date": date,
+            "ticker": details["ticker"],
+            "quantity": sign * abs(quantity),
+            "netValue": sign * (fill.get("walletImpact") or {}).get("netValue", 0),
+        })
+
+    orders = pd.DataFrame(rows, columns=["date", "ticker", "quantity", "netValue"])
+    orders["date"] = pd.to_datetime(orders["date"], utc=True).dt.tz_localize(None).dt.normalize()
+    return orders
+
+
+def _day_range(orders, start, end):
+    start = pd.Timestamp(start).normalize() if start is not None else orders["date"].min()
+    end = pd.Timestamp(end).normalize() if end is not None else pd.Timestamp.now().normalize()
+    return pd.date_range(start, end, freq="D", name="date")
+
+
+def daily_holdings(orders, start=None, end=None):
+    """
+    Shares held per ticker at the end of every day, as a day x ticker DataFrame.
+
+    Orders are scattered into a day x ticker matrix of quantity changes, and a
+    cumulative sum down the day axis turns that into positions. Orders before
+    `start` are folded into the first row so the opening position is correct.
+    """
+    if orders.empty:
+        return pd.DataFrame(index=_day_range(orders, start or pd.Timestamp.now(), end))
+
+    days = _day_range(orders, start, end)
+    orders = orders[orders["date"] <= days[-1]]
+
+    ticker_codes, tickers = pd.factorize(orders["ticker"])
+    day_codes = (orders["date"] - days[0]).dt.days.clip(lower=0).to_numpy()
+
+    changes = np.zeros((len(days), len(tickers)))
+    np.add.at(changes, (day_codes, ticker_codes), orders["quantity"].to_numpy(dtype=float))
+
+    positions = np.cumsum(changes, axis=0)
+    positions[np.isclose(positions, 0, atol=1e-9)] = 0  # float dust from full sells
+
+    return pd.DataFrame(positions, index=days, columns=tickers)
+
+
+def daily_net_deposit(orders, days):
+    """
+    Cumulative net cash put into the portfolio at the end of every day in `days`.
+    """
+    per_day = orders.groupby("date")["netValue"].sum()
+    opening = per_day[per_day.index < days[0]].sum()
+    return per_day.reindex(days, fill_value=0).cumsum() + opening
+
+
+# ===================== PRICE SERIES ===================== #
+
+def snapshot_prices(days):
+    """
+    GBP prices per ticker from the holdings stored with each snapshot,
+    reindexed onto `days`: gaps carry the last price forward, days before a
+    ticker's first snapshot use its first known price.
+    """
+    cursor = snapshots.holdings_docs()
+
+    rows = [
+        {"date": doc["timestampAdded"], "ticker": h["ticker"], "priceGBP": h["priceGBP"]}
+        for doc in cursor for h in doc["portfolio"]
+    ]
+    if not rows:
+        return pd.DataFrame(index=days)
+
+    prices = pd.DataFrame(rows)
+    prices["date"] = pd.to_datetime(prices["date"], utc=True).dt.tz_localize(None).dt.normalize()
+    table = prices.pivot_table(index="date", columns="ticker", values="priceGBP", aggfunc="last")
+
+    return table.reindex(table.index.union(days)).ffill().bfill().reindex(days)
+
+
+def csv_prices(path, days):
+    """
+    GBP prices from a CSV of quoted prices (date,ticker,price), converted with each day's FX rate.
+    """
+    prices = pd.read_csv(path, parse_dates=["date"])
+    prices["date"] = prices["date"].dt.normalize()
+    prices["price"] = prices["price"] * fx.fx_rates.gbp_multipliers(prices["ticker"], prices["date"])
+    table = prices.pivot_table(index="date", columns="ticker", values="price", aggfunc="last")
+
+    return table.reindex(table.index.union(days)).ffill().bfill().reindex(days)
+
+
+# ===================== PORTFOLIO CURVE ===================== #
+
+def portfolio_curve(start=None, end=None, prices=None, orders=None):
+    """
+    Dense daily portfolio history: portfolioValue and netDeposit for every day from
+    `start` (default: first order) to `end` (default: today).
+
+    `prices` is a day x ticker DataFrame of GBP prices; by default the prices
+    recorded in the stored snapshots are used.
+    """
+    orders = load_orders() if orders is None else orders
+    holdings = daily_holdings(orders, start, end)
+    days = holdings.index
+
+    if prices is None:
+        prices = snapshot_prices(days)
+    prices = prices.reindex(index=days, columns=holdings.columns)
+
+    # tickers without any price contribute nothing rather than NaN-ing the whole day
+    values = np.nansum(holdings.to_numpy() * prices.to_numpy(dtype=float), axis=1)
+
+    curve = pd.DataFrame({"portfolioValue": np.round(values, 2)}, index=days)
+    curve["netDeposit"] = np.round(daily_net_deposit(orders, days).to_numpy(), 2)
+    return curve
@@ -0,0 +1,434 @@
+import os
+import sys
+import time
+import random
+import shutil
+import logging
+import argparse
+import tempfile
+import threading
+import subprocess
+import datetime as dt
+import numpy as np
+import requests
+from flask import Flask, jsonify, request
+from werkzeug.serving import make_server
+
+# ===================== LOAD TEST ===================== #
+
+# Drives simulated browser sessions against the Dash callback endpoints of a gunicorn
+# instance whose Starling and Trading212 base URLs point at local stand-ins with injected
+# latency, and reports throughput and latency percentiles for each worker count / user count.
+#
+#   python loadtest.py --workers 1,2,4 --users 1,10,25 --duration 30 --latency-ms 300
+#
+# The dashboard writes to MONGO_DB_NAME (default finance_dashboard_loadtest here), never the real database.
+
+ACCOUNT_UID = "11111111-1111-4111-8111-111111111111"
+SAVINGS_UID = "22222222-2222-4222-8222-222222222222"
+GROCERIES_UID = "33333333-3333-4333-8333-333333333333"
+BILLS_UID = "44444444-4444-4444-8444-444444444444"
+
+# ===================== FAKE UPSTREAMS ===================== #
+
+def _iso(day):
+    return day.strftime("%Y-%m-%dT%H:%M:%S.000Z")
+
+
+def _feed_items(category_uid, start, end):
+    """
+    One deterministic item per day between start and end, enough to exercise the
+    dashboard's parsing and local store.
+    """
+    start = dt.datetime.strptime(start[:19], "%Y-%m-%dT%H:%M:%S")
+    end = dt.datetime.strptime(end[:19], "%Y-%m-%dT%H:%M:%S")
+    categories = ["GROCERIES", "EATING_OUT", "TRANSPORT", "ENTERTAINMENT", "SHOPPING"]
+
+    items, day = [], end
+    while day > start:
+        n = int(day.timestamp()) // 86400
+        items.append({
+            "feedItemUid": f"{category_uid[:8]}-{n}",
+            "categoryUid": category_uid,
+            "direction": "OUT" if n % 4 else "IN",
+            "amount": {"currency": "GBP", "minorUnits": 500 + n % 5000},
+            "sourceAmount": {"currency": "GBP", "minorUnits": 500 + n % 5000},
+            "spendingCategory": categories[n % len(categories)],
+            "counterPartyName": f"Shop {n % 37}",
+            "status": "SETTLED",
+            "transactionTime": _iso(day),
+            "settlementTime": _iso(day),
+        })
+        day -= dt.timedelta(days=1)
+    return items
+
+
+def fake_upstreams(latency_ms, jitter_ms, error_rate):
+    """
+    Flask app standing in for both Starling (/api/v2) and Trading212 (/api/v0).
+    Every response waits latency_ms +- jitter_ms, error_rate of them fail with a 503.
+    """
+    app = Flask("fake_upstreams")
+    stats = {"calls": 0, "errors": 0}
+    lock = threading.Lock()
+
+    @app.before_request
+    def inject():
+        if request.path == "/_stats":
+            return None
+        time.sleep(max(0.0, random.gauss(latency_ms, jitter_ms)) / 1000)
+        with lock:
+            stats["calls"] += 1
+            failed = random.random() < error_rate
+            stats["errors"] += failed
+        if failed:
+            return jsonify({"error": "injected failure"}), 503
+
+    @app.route("/_stats", methods=["GET", "DELETE"])
+    def stats_endpoint():
+        with lock:
+            current = dict(stats)
+            if request.method == "DELETE":
+                stats.update(calls=0, errors=0)
+        return jsonify(current)
+
+    # ---------- STARLING ----------
+    @app.route("/api/v2/accounts")
+    def accounts():
+        return jsonify({"accounts": [
+            {"accountUid": ACCOUNT_UID, "defaultCategory": ACCOUNT_UID.replace("1111", "aaaa", 1)},
+            {"accountUid": SAVINGS_UID, "defaultCategory": SAVINGS_UID.replace("2222", "bbbb", 1)},
+        ]})
+
+    @app.route("/api/v2/accounts/<uid>/balance")
+    def balance(uid):
+        return jsonify({"effectiveBalance": {"currency": "GBP", "minorUnits": 12345 if uid == ACCOUNT_UID else 523400}})
+
+    @app.route("/api/v2/account/<uid>/spaces")
+    def spaces(uid):
+        return jsonify({"savingsGoals": [
+            {"name": "Groceries", "savingsGoalUid": GROCERIES_UID,
+             "target": {"minorUnits": 15000}, "totalSaved": {"minorUnits": 6200}},
+            {"name": "Bills", "savingsGoalUid": BILLS_UID,
+             "target": {"minorUnits": 90000}, "totalSaved": {"minorUnits": 45000}},
+        ]})
+
+    @app.route("/api/v2/feed/account/<uid>/category/<category_uid>/transactions-between")
+    def transactions_between(uid, category_uid):
+        return jsonify({"feedItems": _feed_items(
+            category_uid, request.args["minTransactionTimestamp"], request.args["maxTransactionTimestamp"]
+        )})
+
+    @app.route("/api/v2/accounts/<uid>/spending-insights/spending-category")
+    def spending_categories(uid):
+        return jsonify({"breakdown": [
+            {"spendingCategory": "EATING_OUT", "netSpend": 142.5, "netDirection": "OUT"},
+            {"spendingCategory": "TRANSPORT", "netSpend": 64.2, "netDirection": "OUT"},
+            {"spendingCategory": "INCOME", "netSpend": 2100.0, "netDirection": "IN"},
+        ]})
+
+    # ---------- TRADING212 ----------
+    @app.route("/api/v0/equity/portfolio")
+    def portfolio():
+        return jsonify([
+            {"ticker": "VUSAl_EQ", "quantity": 12.5, "currentPrice": 91.3},
+            {"ticker": "AAPL_US_EQ", "quantity": 3, "currentPrice": 228.1},
+        ])
+
+    @app.route("/api/v0/equity/history/orders")
+    def orders():
+        created = _iso(dt.datetime.now(dt.UTC) - dt.timedelta(days=30))
+        return jsonify({"items": [{
+            "dateCreated": created,
+            "order": {"id": 1, "side": "BUY", "ticker": "VUSAl_EQ", "filledQuantity": 12.5, "createdAt": created},
+            "fill": {"filledAt": created, "quantity": 12.5, "price": 80.0, "walletImpact": {"netValue": 1000.0}},
+        }], "nextPagePath": None})
+
+    return app, stats
+
+
+def start_fake_upstreams(port, latency_ms, jitter_ms, error_rate):
+    app, _ = fake_upstreams(latency_ms, jitter_ms, error_rate)
+    logging.getLogger("werkzeug").setLevel(logging.ERROR)  # no access log line per fake call
+    server = make_server("127.0.0.1", port, app, threaded=True)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    return server
+
+# ===================== DASHBOARD INSTANCE ===================== #
+
+def start_dashboard(port, workers, threads, upstream_url, env_overrides):
+    """
+    Starts gunicorn (see gunicorn.conf.py) against the fake upstreams, with its own
+    cache files. Returns (process, scratch dir) once the layout is served.
+    """
+    scratch = tempfile.mkdtemp(prefix="loadtest-")
+    env = dict(
+        os.environ,
+        BIND=f"127.0.0.1:{port}",
+        WEB_CONCURRENCY=str(workers),
+        GUNICORN_THREADS=str(threads),
+        STARLING_BASE_URL=f"{upstream_url}/api/v2",
+        TRADING212_BASE_URL=upstream_url,
+        CACHE_PATH=os.path.join(scratch, "cache.sqlite3"),
+        LAST_GOOD_PATH=os.path.join(scratch, "last_good.sqlite3"),
+        PAYMENT_TOKEN="loadtest",
+        **env_overrides,
+    )
+    process = subprocess.Popen(
+        [sys.executable, "-m", "gunicorn", "-c", "gunicorn.conf.py", "--access-logfile", os.devnull, "wsgi:server"],
+        env=env,
+        cwd=os.path.dirname(os.path.abspath(__file__)),
+        stdout=subprocess.DEVNULL,
+        stderr=subprocess.DEVNULL,
+    )
+
+    deadline = time.time() + 180
+    while time.time() < deadline:
+        if process.poll() is not None:
+            raise RuntimeError("gunicorn exited during startup, run it by hand to see why")
+        try:
+            if requests.get(f"http://127.0.0.1:{port}/_dash-layout", timeout=5).ok:
+                return process, scratch
+        except requests.exceptions.RequestException:
+            pass
+        time.sleep(0.5)
+
+    process.terminate()
+    raise RuntimeError("dashboard didn't come up within 180s")
+
+
+def stop_dashboard(process, scratch):
+    process.terminate()
+    try:
+        process.wait(timeout=30)
+    except subprocess.TimeoutExpired:
+        process.kill()
+    shutil.rmtree(scratch, ignore_errors=True)
+
+# ===================== SESSIONS ===================== #
+
+def _find(node, component_id):
+    if isinstance(node, dict):
+        props = node.get("props", {})
+        if props.get("id") == component_id:
+            return props
+        for value in props.values():
+            found = _find(value, component_id)
+            if found:
+                return found
+    elif isinstance(node, list):
+        for value in node:
+            found = _find(value, component_id)
+            if found:
+                return found
+    return None
+
+
+def _callback_body(dependency, inputs, state=()):
+    outputs = [
+        {"id": o.split(".")[0], "property": o.split(".")[1].split("@")[0]}
+        for o in dependency["output"].strip(".").split("...")
+    ]
+    return {
+        "output": dependency["output"],
+        "outputs": outputs if dependency["output"].startswith("..") else outputs[0],
+        "inputs": [dict(i, value=v) for i, v in zip(dependency["inputs"], inputs)],
+        "state": [dict(s, value=v) for s, v in zip(dependency["state"], state)],
+        "changedPropIds": [f"{dependency['inputs'][0]['id']}.{dependency['inputs'][0]['property']}"],
+    }
+
+
+class BrowserSession:
+    """
+    One simulated viewer: loads the page the way the Dash renderer does (layout,
+    dependencies, initial callbacks), then now and then presses Refresh.
+    """
+
+    def __init__(self, base_url, record, refresh_ratio, think_ms):
+        self.base_url = base_url
+        self.record = record
+        self.refresh_ratio = refresh_ratio
+        self.think_ms = think_ms
+        self.http = requests.Session()
+        self.http.headers["Accept-Encoding"] = "gzip, br"
+
+    def _timed(self, name, method, path, **kwargs):
+        start = time.perf_counter()
+        try:
+            response = self.http.request(method, self.base_url + path, timeout=120, **kwargs)
+            ok = response.ok
+        except requests.exceptions.RequestException:
+            response, ok = None, False
+        self.record(name, time.perf_counter() - start, ok)
+        return response.json() if ok else None
+
+    def page_load(self):
+        layout = self._timed("layout", "GET", "/_dash-layout")
+        dependencies = self._timed("dependencies", "GET", "/_dash-dependencies")
+        if layout is None or dependencies is None:
+            return None
+
+        monthly = next(d for d in dependencies if d["output"] == "monthly-transactions-store.data")
+        refresh = next(d for d in dependencies if "pocket-donut.figure" in d["output"])
+        picker = _find(layout, "transactions-range") or {}
+        categories_picker = _find(layout, "categories-range") or {}
+        figure_versions = (_find(layout, "figure-versions") or {}).get("data")
+
+        # refresh_all state: figure versions, then the category picker's range
+        state = [figure_versions, categories_picker.get("start_date"), categories_picker.get("end_date")]
+
+        self._timed("load_monthly_data", "POST", "/_dash-update-component",
+                    json=_callback_body(monthly, [picker.get("start_date"), picker.get("end_date")]))
+        self._timed("refresh_all", "POST", "/_dash-update-component",
+                    json=_callback_body(refresh, [None], state))
+        return refresh, state
+
+    def manual_refresh(self, refresh, state):
+        trigger = {"timestamp": dt.datetime.now().isoformat(), "manual": True}
+        self._timed("refresh_all (manual)", "POST", "/_dash-update-component",
+                    json=_callback_body(refresh, [trigger], state))
+
+    def run(self, deadline):
+        while time.time() < deadline:
+            loaded = self.page_load()
+            self.record("page_load", None, loaded is not None)
+
+            if loaded and random.random() < self.refresh_ratio and time.time() < deadline:
+                time.sleep(self.think_ms / 1000)
+                self.manual_refresh(*loaded)
+
+            time.sleep(self.think_ms / 1000)
+
+# ===================== RUNNER ===================== #
+
+class Recorder:
+    """
+    Latencies of successful requests and error counts, by request name.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.latencies = {}
+        self.errors = {}
+        self.page_loads = 0
+
+    def __call__(self, name, seconds, ok):
+        with self._lock:
+            if name == "page_load":
+                self.page_loads += ok
+            elif ok:
+                self.latencies.setdefault(name, []).append(seconds)
+            else:
+                self.errors[name] = self.errors.get(name, 0) + 1
+                self.latencies.setdefault(name, [])
+
+
+def run_load(base_url, users, duration, refresh_ratio, think_ms, ramp_seconds=2):
+    """
+    Runs `users` concurrent sessions for `duration` seconds. Returns a Recorder.
+    """
+    recorder = Recorder()
+    deadline = time.time() + duration
+    sessions = []
+
+    for i in range(users):
+        session = BrowserSession(base_url, recorder, refresh_ratio, think_ms)
+        thread = threading.Thread(target=session.run, args=(deadline,), daemon=True)
+        thread.start()
+        sessions.append(thread)
+        time.sleep(ramp_seconds / users)  # don't have every session hit the page in the same millisecond
+
+    for thread in sessions:
+        thread.join()
+    return recorder
+
+
+def summarize(recorder, duration):
+    rows = {}
+    for name, samples in sorted(recorder.latencies.items()):
+        ms = np.array(samples) * 1000
+        rows[name] = {
+            "count": len(samples),
+            "errors": recorder.errors.get(name, 0),
+            "rps": len(samples) / duration,
+            "p50": np.percentile(ms, 50) if len(ms) else float("nan"),
+            "p95": np.percentile(ms, 95) if len(ms) else float("nan"),
+            "p99": np.percentile(ms, 99) if len(ms) else float("nan"),
+        }
+    return rows
+
+
+def print_report(workers, users, recorder, rows, upstream, duration):
+    requests_total = sum(r["count"] for r in rows.values())
+    errors_total = sum(r["errors"] for r in rows.values())
+    print(f"\n=== {workers} worker(s), {users} user(s): {requests_total / duration:.1f} req/s, "
+          f"{recorder.page_loads / duration:.2f} page loads/s, {errors_total} errors, "
+          f"{upstream['calls']} upstream calls ===")
+    print(f"{'request':<24}{'count':>8}{'req/s':>8}{'p50 ms':>10}{'p95 ms':>10}{'p99 ms':>10}{'errors':>8}")
+    for name, r in rows.items():
+        print(f"{name:<24}{r['count']:>8}{r['rps']:>8.1f}{r['p50']:>10.0f}{r['p95']:>10.0f}{r['p99']:>10.0f}{r['errors']:>8}")
+
+
+def print_scaling(results):
+    print("\n=== refresh_all p95 (ms) by workers x users ===")
+    users = sorted({u for _, u in results})
+    print(f"{'workers':<10}" + "".join(f"{u:>10}" for u in users))
+    for workers in sorted({w for w, _ in results}):
+        cells = [results.get((workers, u), {}).get("refresh_all", {}).get("p95", float("nan")) for u in users]
+        print(f"{workers:<10}" + "".join(f"{c:>10.0f}" for c in cells))
+
+
+def _int_list(value):
+    return [int(v) for v in value.split(",") if v]
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Concurrent-viewer load test against fake upstreams")
+    parser.add_argument("--workers", type=_int_list, default=[1, 2, 4], help="gunicorn worker counts, e.g. 1,2,4")
+    parser.add_argument("--threads", type=int, default=2, help="threads per gunicorn worker")
+    parser.add_argument("--users", type=_int_list, default=[1, 10, 25], help="concurrent sessions, e.g. 1,10,25")
+    parser.add_argument("--duration", type=int, default=30, help="seconds per run")
+    parser.add_argument("--latency-ms", type=float, default=300, help="mean upstream latency")
+    parser.add_argument("--jitter-ms", type=float, default=100)
+    parser.add_argument("--error-rate", type=float, default=0.0, help="fraction of upstream calls answered with a 503")
+    parser.add_argument("--refresh-ratio", type=float, default=0.2, help="chance a session presses Refresh after a page load")
+    parser.add_argument("--think-ms", type=float, default=1000, help="pause between a session's actions")
+    parser.add_argument("--api-cache-ttl", default=None, help="API_CACHE_TTL for the dashboard, 0 disables the shared cache")
+    parser.add_argument("--port", type=int, default=8060)
+    parser.add_argument("--upstream-port", type=int, default=8061)
+    parser.add_argument("--target", help="load an already running dashboard instead of starting gunicorn")
+    args = parser.parse_args()
+
+    upstream_url = f"http://127.0.0.1:{args.upstream_port}"
+    upstream_server = start_fake_upstreams(args.upstream_port, args.latency_ms, args.jitter_ms, args.error_rate)
+    print(f"[loadtest] Fake upstreams on {upstream_url} ({args.latency_ms:.0f}±{args.jitter_ms:.0f} ms)")
+
+    env_overrides = {"MONGO_DB_NAME": os.getenv("MONGO_DB_NAME", "finance_dashboard_loadtest")}
+    if args.api_cache_ttl is not None:
+        env_overrides["API_CACHE_TTL"] = args.api_cache_ttl
+
+    results = {}
+    for workers in ([None] if args.target else args.workers):
+        if args.target:
+            base_url, process = args.target.rstrip("/"), None
+        else:
+            print(f"[loadtest] Starting dashboard with {workers} worker(s)")
+            process, scratch = start_dashboard(args.port, workers, args.threads, upstream_url, env_overrides)
+            base_url = f"http://127.0.0.1:{args.port}"
+
+        try:
+            for users in args.users:
+                requests.delete(f"{upstream_url}/_stats")
+                recorder = run_load(base_url, users, args.duration, args.refresh_ratio, args.think_ms)
+                upstream = requests.get(f"{upstream_url}/_stats").json()
+
+                rows = summarize(recorder, args.duration)
+                results[(workers, users)] = rows
+                print_report(workers or "?", users, recorder, rows, upstream, args.duration)
+        finally:
+            if process:
+                stop_dashboard(process, scratch)
+
+    if not args.target:
+        print_scaling(results)
+    upstream_server.shutdown()
@@ -0,0 +1,204 @@
+import re
+import time
+import threading
+from functools import wraps
+from contextlib import contextmanager
+from flask import Response
+from pymongo import monitoring
+
+# ===================== PROMETHEUS METRICS ===================== #
+
+# latency buckets in seconds, from a fast Mongo lookup up to a stalled bank API
+DEFAULT_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30)
+
+REGISTRY = []
+
+# account, category and space uids would make every endpoint its own series
+UID_PATTERN = re.compile(r"[0-9a-fA-F]{8}-[0-9a-fA-F]{4}-[0-9a-fA-F]{4}-[0-9a-fA-F]{4}-[0-9a-fA-F]{12}")
+
+
+class Histogram:
+    """
+    Minimal thread-safe Prometheus histogram. Every series also exposes
+    _count and _sum, so call counts come for free.
+    """
+
+    def __init__(self, name, documentation, labelnames, buckets=DEFAULT_BUCKETS):
+        self.name = name
+        self.documentation = documentation
+        self.labelnames = tuple(labelnames)
+        self.buckets = tuple(buckets)
+        self._series = {}
+        self._lock = threading.Lock()
+        REGISTRY.append(self)
+
+    def observe(self, value, **labels):
+        key = tuple(str(labels[name]) for name in self.labelnames)
+
+        with self._lock:
+            series = self._series.get(key)
+            if series is None:
+                # [cumulative bucket counts, count, sum]
+                series = self._series[key] = [[0] * len(self.buckets), 0, 0.0]
+
+            for i, bound in enumerate(self.buckets):
+                if value <= bound:
+                    series[0][i] += 1
+            series[1] += 1
+            series[2] += value
+
+    def render(self):
+        with self._lock:
+            snapshot = {key: (list(b), c, s) for key, (b, c, s) in self._series.items()}
+
+        lines = [
+            f"# HELP {self.name} {self.documentation}",
+            f"# TYPE {self.name} histogram",
+        ]
+        for key, (bucket_counts, count, total) in sorted(snapshot.items()):
+            labels = [f'{name}="{_escape(value)}"' for name, value in zip(self.labelnames, key)]
+
+            for bound, n in zip(self.buckets, bucket_counts):
+                le = 'le="%s"' % bound
+                lines.append(f"{self.name}_bucket{_labels(labels + [le])} {n}")
+            le = 'le="+Inf"'
+            lines.append(f"{self.name}_bucket{_labels(labels + [le])} {count}")
+            lines.append(f"{self.name}_count{_labels(labels)} {count}")
+            lines.append(f"{self.name}_sum{_labels(labels)} {total}")
+
+        return lines
+
+
+def _escape(value):
+    return value.replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"')
+
+
+def _labels(pairs):
+    return "{" + ",".join(pairs) + "}" if pairs else ""
+
+
+def render():
+    """
+    Returns every registered metric in the Prometheus text exposition format.
+    """
+    lines = []
+    for metric in REGISTRY:
+        lines.extend(metric.render())
+    return "\n".join(lines) + "\n"
+
+
+def endpoint_label(path):
+    """
+    Collapses a request path into a low-cardinality label,
+    e.g. /accounts/<uid>/balance -> /accounts/{uid}/balance
+    """
+    return UID_PATTERN.sub("{uid}", path.split("?")[0])
+
+
+# ---------- METRIC DEFINITIONS ----------
+CALLBACK_LATENCY = Histogram(
+    "dash_callback_duration_seconds",
+    "Time spent executing Dash callbacks.",
+    ["callback", "status"],
+)
+
+STARLING_LATENCY = Histogram(
+    "starling_request_duration_seconds",
+    "Time spent on each Starling API request attempt.",
+    ["endpoint", "status"],
+)
+
+TRADING212_LATENCY = Histogram(
+    "trading212_request_duration_seconds",
+    "Time spent on each Trading212 API request.",
+    ["endpoint", "status"],
+)
+
+DATASET_LATENCY = Histogram(
+    "dataset_load_duration_seconds",
+    "Time spent loading each panel dataset, dependencies excluded (see dataflow.py).",
+    ["dataset", "status"],
+)
+
+MONGO_LATENCY = Histogram(
+    "mongo_command_duration_seconds",
+    "Time spent on MongoDB commands, as reported by the driver.",
+    ["command", "collection", "status"],
+)
+
+
+# ---------- INSTRUMENTATION HELPERS ----------
+@contextmanager
+def track(histogram, **labels):
+    """
+    Times the enclosed block. The caller may set labels['status'] (e.g. to an
+    HTTP status code); otherwise it is 'ok' or 'error' depending on the outcome.
+    """
+    start = time.perf_counter()
+    try:
+        yield labels
+    except BaseException:
+        labels.setdefault("status", "error")
+        raise
+    else:
+        labels.setdefault("status", "ok")
+    finally:
+        histogram.observe(time.perf_counter() - start, **labels)
+
+
+def timed_callback(name):
+    """
+    Decorator for Dash callbacks. Apply it below @app.callback.
+    """
+    def decorator(fn):
+        @wraps(fn)
+        def wrapper(*args, **kwargs):
+            with track(CALLBACK_LATENCY, callback=name):
+                return fn(*args, **kwargs)
+        return wrapper
+    return decorator
+
+
+class MongoCommandListener(monitoring.CommandListener):
+    """
+    pymongo command listener feeding MONGO_LATENCY. Pass an instance to
+    MongoClient(event_listeners=[...]).
+    """
+
+    def __init__(self):
+        # the collection name is only on the started event
+        self._pending = {}
+
+    def _key(self, event):
+        return (event.connection_id, event.request_id)
+
+    def started(self, event):
+        collection = event.command.get(event.command_name)
+        if not isinstance(collection, str):
+            collection = ""
+        self._pending[self._key(event)] = collection
+
+    def _observe(self, event, status):
+        collection = self._pending.pop(self._key(event), "")
+        MONGO_LATENCY.observe(
+            event.duration_micros / 1_000_000,
+            command=event.command_name,
+            collection=collection,
+            status=status,
+        )
+
+    def succeeded(self, event):
+        self._observe(event, "ok")
+
+    def failed(self, event):
+        self._observe(event, "error")
+
+
+# ---------- FLASK ROUTE ----------
+def init_app(server):
+    """
+    Registers the /metrics route on the Dash Flask server.
+    """
+    @server.route("/metrics")
+    def metrics_endpoint():
+        return Response(render(), mimetype="text/plain; version=0.0.4")
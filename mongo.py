@@ -0,0 +1,79 @@
+import os
+import threading
+from dotenv import load_dotenv
+from pymongo import MongoClient, ReadPreference
+import metrics
+
+# ===================== MONGODB CLIENT ===================== #
+
+load_dotenv()
+MONGO_URI = os.getenv("MONGO_URI_ONLINE")
+DB_NAME = os.getenv("MONGO_DB_NAME", "finance_dashboard")
+
+# pool and timeout settings, all overridable from the environment
+MAX_POOL_SIZE = int(os.getenv("MONGO_MAX_POOL_SIZE", "20"))
+MIN_POOL_SIZE = int(os.getenv("MONGO_MIN_POOL_SIZE", "0"))
+MAX_IDLE_TIME_MS = int(os.getenv("MONGO_MAX_IDLE_TIME_MS", "300000"))
+CONNECT_TIMEOUT_MS = int(os.getenv("MONGO_CONNECT_TIMEOUT_MS", "5000"))
+SERVER_SELECTION_TIMEOUT_MS = int(os.getenv("MONGO_SERVER_SELECTION_TIMEOUT_MS", "5000"))
+SOCKET_TIMEOUT_MS = int(os.getenv("MONGO_SOCKET_TIMEOUT_MS", "30000"))
+READ_PREFERENCE = os.getenv("MONGO_READ_PREFERENCE", "primaryPreferred")
+
+READ_PREFERENCES = {
+    "primary": ReadPreference.PRIMARY,
+    "primaryPreferred": ReadPreference.PRIMARY_PREFERRED,
+    "secondary": ReadPreference.SECONDARY,
+    "secondaryPreferred": ReadPreference.SECONDARY_PREFERRED,
+    "nearest": ReadPreference.NEAREST,
+}
+
+_client = None
+_client_pid = None
+_lock = threading.Lock()
+
+
+def get_client():
+    """
+    Returns the process-wide MongoClient, creating it on first use.
+
+    The client is tied to the process that created it: after a fork (e.g. gunicorn
+    with preload_app) the child gets its own client and connection pool instead of
+    sharing the parent's sockets.
+    """
+    global _client, _client_pid
+
+    if _client is not None and _client_pid == os.getpid():
+        return _client
+
+    with _lock:
+        if _client is None or _client_pid != os.getpid():
+            _client = MongoClient(
+                MONGO_URI,
+                maxPoolSize=MAX_POOL_SIZE,
+                minPoolSize=MIN_POOL_SIZE,
+                maxIdleTimeMS=MAX_IDLE_TIME_MS,
+                connectTimeoutMS=CONNECT_TIMEOUT_MS,
+                serverSelectionTimeoutMS=SERVER_SELECTION_TIMEOUT_MS,
+                socketTimeoutMS=SOCKET_TIMEOUT_MS,
+                read_preference=READ_PREFERENCES[READ_PREFERENCE],
+                event_listeners=[metrics.MongoCommandListener()],
+                connect=False,  # connect on first operation, never before a fork
+            )
+            _client_pid = os.getpid()
+
+    return _client
+
+
+def get_db():
+    return get_client()[DB_NAME]
+
+
+def _reset_after_fork():
+    # the inherited client must not be used (or closed) by the child
+    global _client, _client_pid, _lock
+    _client, _client_pid = None, None
+    _lock = threading.Lock()
+
+
+if hasattr(os, "register_at_fork"):
+    os.register_at_fork(after_in_child=_reset_after_fork)
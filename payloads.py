@@ -0,0 +1,92 @@
+import os
+import gzip
+import plotly.io as pio
+from flask import request
+
+try:
+    import brotli
+except ImportError:  # gzip only
+    brotli = None
+
+try:
+    import orjson
+except ImportError:
+    orjson = None
+
+# ===================== CALLBACK PAYLOADS ===================== #
+
+# "columns" sends the transactions store as {column: [values]} instead of one dict per row,
+# so the column names aren't repeated for every transaction. Set to "records" for the old format.
+STORE_ORIENT = os.getenv("STORE_ORIENT", "columns")
+
+# responses smaller than this aren't worth the CPU
+MIN_COMPRESS_SIZE = 500
+COMPRESSIBLE_TYPES = ("application/json", "text/html", "text/css", "text/plain", "application/javascript")
+GZIP_LEVEL = 6
+BROTLI_QUALITY = 5  # quality 11 is far too slow for per-request compression
+
+
+def encode_frame(df):
+    """
+    Encodes a DataFrame for a dcc.Store. pd.DataFrame(...) reads back either orientation.
+    """
+    if STORE_ORIENT == "columns":
+        return df.to_dict("list")
+    return df.to_dict("records")
+
+
+def configure_json():
+    """
+    Dash serializes callback outputs through plotly's JSON encoder, which can use orjson.
+    """
+    if orjson is not None:
+        pio.json.config.default_engine = "orjson"
+    else:
+        print("[payloads] orjson not installed, using the standard json encoder")
+
+
+def _negotiate_encoding():
+    accepted = request.accept_encodings
+    if brotli is not None and accepted.quality("br") > 0:
+        return "br"
+    if accepted.quality("gzip") > 0:
+        return "gzip"
+    return None
+
+
+def _compress_response(response):
+    # static files are streamed (direct_passthrough); Dash already serves its
+    # fingerprinted component bundles with long-lived cache headers
+    if (
+        response.direct_passthrough
+        or response.status_code != 200
+        or "Content-Encoding" in response.headers
+        or response.mimetype not in COMPRESSIBLE_TYPES
+    ):
+        return response
+
+    payload = response.get_data()
+    if len(payload) < MIN_COMPRESS_SIZE:
+        return response
+
+    response.vary.add("Accept-Encoding")
+    encoding = _negotiate_encoding()
+    if encoding is None:
+        return response
+
+    if encoding == "br":
+        compressed = brotli.compress(payload, quality=BROTLI_QUALITY)
+    else:
+        compressed = gzip.compress(payload, compresslevel=GZIP_LEVEL)
+
+    response.set_data(compressed)
+    response.headers["Content-Encoding"] = encoding
+    return response
+
+
+def init_app(server):
+    """
+    Enables the faster JSON encoder and negotiated br/gzip compression on the Dash Flask server.
+    """
+    configure_json()
+    server.after_request(_compress_response)
@@ -0,0 +1,104 @@
+import os
+import time
+import cProfile
+import threading
+from pathlib import Path
+from urllib.parse import urlparse, parse_qs
+from flask import g, request
+
+# ===================== CALLBACK PROFILING ===================== #
+
+# Opt-in only. Either profile every callback:
+#   PROFILE_CALLBACKS=1
+# or let allow-listed clients opt in by opening the dashboard with ?profile=1:
+#   PROFILE_ALLOWED_CLIENTS=127.0.0.1,192.168.1.20
+# Profiles are written as .pstats files; inspect them with `python -m pstats <file>` or snakeviz.
+PROFILE_ALWAYS = os.getenv("PROFILE_CALLBACKS", "0") == "1"
+PROFILE_ALLOWED_CLIENTS = {ip.strip() for ip in os.getenv("PROFILE_ALLOWED_CLIENTS", "").split(",") if ip.strip()}
+PROFILE_DIR = Path(os.getenv("PROFILE_DIR", "profiles"))
+PROFILE_KEEP = int(os.getenv("PROFILE_KEEP", "20"))
+
+CALLBACK_PATH = "/_dash-update-component"
+
+# cProfile can only run one profiler at a time, so concurrent callbacks are skipped
+_profile_lock = threading.Lock()
+
+
+def _requested_by_client():
+    """
+    True if an allow-listed client asked for profiling with ?profile=1. Callback requests
+    are POSTs from the page, so the flag is also read off the page URL in the Referer.
+    """
+    if request.remote_addr not in PROFILE_ALLOWED_CLIENTS:
+        return False
+
+    if request.args.get("profile") == "1":
+        return True
+
+    referrer_query = parse_qs(urlparse(request.referrer or "").query)
+    return referrer_query.get("profile") == ["1"]
+
+
+def _callback_name():
+    """
+    Dash sends the output id(s) of the callback being executed, e.g. 'monthly-transactions-store.data'
+    """
+    payload = request.get_json(silent=True) or {}
+    output = payload.get("output", "callback")
+
+    # multi-output callbacks look like '..pocket-donut.figure...groceries-donut.figure..'
+    name = output.strip(".").split(".")[0]
+    return "".join(c if c.isalnum() or c in "-_" else "_" for c in name) or "callback"
+
+
+def _prune(keep):
+    """
+    Keeps only the slowest `keep` profiles. Filenames start with the zero-padded duration.
+    """
+    profiles = sorted(PROFILE_DIR.glob("*.pstats"), reverse=True)
+    for stale in profiles[keep:]:
+        stale.unlink(missing_ok=True)
+
+
+def _start_profile():
+    if request.path != CALLBACK_PATH:
+        return
+    if not (PROFILE_ALWAYS or _requested_by_client()):
+        return
+    if not _profile_lock.acquire(blocking=False):
+        return
+
+    g.profiler = cProfile.Profile()
+    g.profile_started = time.perf_counter()
+    g.profiler.enable()
+
+
+def _stop_profile(_exc=None):
+    profiler = g.pop("profiler", None)
+    if profiler is None:
+        return
+
+    try:
+        profiler.disable()
+        elapsed_ms = (time.perf_counter() - g.pop("profile_started")) * 1000
+
+        PROFILE_DIR.mkdir(parents=True, exist_ok=True)
+        filename = f"{int(elapsed_ms):09d}ms_{_callback_name()}_{time.strftime('%Y%m%dT%H%M%S')}.pstats"
+        profiler.dump_stats(PROFILE_DIR / filename)
+        _prune(PROFILE_KEEP)
+    except Exception as e:
+        print(f"[profiling] Failed to write profile: {e}")
+    finally:
+        _profile_lock.release()
+
+
+def init_app(server):
+    """
+    Wraps Dash callback requests on the Flask server in cProfile when profiling is enabled.
+    """
+    if not (PROFILE_ALWAYS or PROFILE_ALLOWED_CLIENTS):
+        return
+
+    server.before_request(_start_profile)
+    # teardown runs even when the callback raises, so the lock is always released
+    server.teardown_request(_stop_profile)
@@ -0,0 +1,97 @@
+import os
+import time
+import threading
+import requests
+
+# ===================== CIRCUIT BREAKERS ===================== #
+
+# After FAILURES consecutive failures an upstream is skipped for RESET_SECONDS, then a single
+# trial call decides whether it's back. Panels are served from their last good data meanwhile.
+CIRCUIT_FAILURES = int(os.getenv("CIRCUIT_FAILURES", "3"))
+CIRCUIT_RESET_SECONDS = int(os.getenv("CIRCUIT_RESET_SECONDS", "60"))
+
+
+class CircuitOpen(Exception):
+    """
+    Raised instead of calling an upstream whose circuit is open.
+    """
+
+    def __init__(self, name):
+        super().__init__(f"{name} circuit is open, skipping the call")
+        self.name = name
+
+
+class CircuitBreaker:
+    """
+    Per-process breaker: closed (calls go through), open (calls fail fast) and
+    half-open (one trial call after reset_seconds).
+    """
+
+    def __init__(self, name, failures=CIRCUIT_FAILURES, reset_seconds=CIRCUIT_RESET_SECONDS):
+        self.name = name
+        self.failures = failures
+        self.reset_seconds = reset_seconds
+        self._lock = threading.Lock()
+        self._consecutive = 0
+        self._opened_at = None
+        self._trial_running = False
+
+    @property
+    def state(self):
+        with self._lock:
+            if self._opened_at is None:
+                return "closed"
+            if time.monotonic() - self._opened_at >= self.reset_seconds:
+                return "half-open"
+            return "open"
+
+    def allow(self):
+        with self._lock:
+            if self._opened_at is None:
+                return True
+            if time.monotonic() - self._opened_at < self.reset_seconds or self._trial_running:
+                return False
+            self._trial_running = True
+            return True
+
+    def check(self):
+        if not self.allow():
+            raise CircuitOpen(self.name)
+
+    def record_success(self):
+        with self._lock:
+            if self._opened_at is not None:
+                print(f"[CircuitBreaker] {self.name} recovered, closing circuit")
+            self._consecutive = 0
+            self._opened_at = None
+            self._trial_running = False
+
+    def record_failure(self):
+        with self._lock:
+            self._consecutive += 1
+            self._trial_running = False
+            if self._opened_at is not None or self._consecutive >= self.failures:
+                if self._opened_at is None:
+                    print(f"[CircuitBreaker] {self.name} failed {self._consecutive} times, opening circuit")
+                self._opened_at = time.monotonic()
+
+
+def is_outage(error):
+    """
+    Whether an error says something about the upstream's health. Client errors (bad
+    request, not found...) don't count against the circuit.
+    """
+    if isinstance(error, requests.exceptions.HTTPError) and error.response is not None:
+        status = error.response.status_code
+        return status >= 500 or status == 429
+    return isinstance(error, requests.exceptions.RequestException)
+
+
+breakers = {
+    "starling": CircuitBreaker("starling"),
+    "trading212": CircuitBreaker("trading212"),
+}
+
+
+def open_circuits():
+    return sorted(name for name, breaker in breakers.items() if breaker.state != "closed")
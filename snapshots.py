@@ -0,0 +1,312 @@
+import argparse
+import threading
+import datetime as dt
+import pandas as pd
+from pymongo import InsertOne, UpdateMany, UpdateOne
+from pymongo.errors import BulkWriteError, CollectionInvalid, OperationFailure
+import mongo
+import versions
+
+# ===================== SNAPSHOT STORAGE ===================== #
+
+# Daily portfolio/net worth snapshots are stored in one of two layouts:
+#   legacy:     portfolio_value, one plain document per day with the holdings array embedded
+#   timeseries: portfolio_series, a MongoDB time-series collection holding only the scalar totals,
+#               plus portfolio_holdings, one document per day with the holdings array
+# The time-series layout is used as soon as `python snapshots.py migrate` has created it.
+# Updating time-series measurements (fx.py revaluation) needs MongoDB 7.0+.
+
+LEGACY = "portfolio_value"
+SERIES = "portfolio_series"
+HOLDINGS = "portfolio_holdings"
+
+SERIES_FIELDS = ("netDeposit", "portfolioValue", "savingsTotal", "netWorth")
+
+# a day that made it into portfolio_holdings but not portfolio_series (the save failed or was
+# interrupted in between) is rewritten once its holdings document is this old, so a writer
+# still between the two inserts isn't raced
+SERIES_REPAIR_AFTER_SECONDS = 60
+
+_timeseries = None
+_indexed = False
+_lock = threading.Lock()
+
+
+def timeseries_enabled():
+    """
+    True once the time-series layout exists. Checked once per process; restart the
+    dashboard after migrating.
+    """
+    global _timeseries
+    if _timeseries is None:
+        with _lock:
+            if _timeseries is None:
+                _timeseries = SERIES in mongo.get_db().list_collection_names()
+    return _timeseries
+
+
+def ensure_indexes():
+    global _indexed
+    db = mongo.get_db()
+
+    # one snapshot per day. older legacy documents have no snapshotDate, hence the partial index
+    db[LEGACY].create_index(
+        "snapshotDate",
+        unique=True,
+        partialFilterExpression={"snapshotDate": {"$exists": True}},
+    )
+
+    # time-series collections can't have unique indexes, so the holdings collection guards the day
+    if timeseries_enabled():
+        db[HOLDINGS].create_index("snapshotDate", unique=True)
+        db[HOLDINGS].create_index("timestampAdded")
+        db[SERIES].create_index("snapshotDate")
+
+    _indexed = True
+
+
+def _duplicate_indexes(error):
+    """
+    Indexes of the operations a BulkWriteError rejected as duplicate days. Re-raises anything else.
+    """
+    write_errors = error.details["writeErrors"]
+    if any(err["code"] != 11000 for err in write_errors):
+        raise error
+    return {err["index"] for err in write_errors}
+
+
+def _split(doc):
+    series_doc = {"timestampAdded": doc["timestampAdded"], "snapshotDate": doc["snapshotDate"]}
+    series_doc.update({field: doc[field] for field in SERIES_FIELDS if field in doc})
+
+    holdings_doc = {
+        "snapshotDate": doc["snapshotDate"],
+        "timestampAdded": doc["timestampAdded"],
+        "portfolio": doc.get("portfolio", []),
+        "savingsTotal": doc.get("savingsTotal"),
+    }
+    if doc.get("backfilled"):
+        holdings_doc["backfilled"] = True
+
+    return series_doc, holdings_doc
+
+
+# ---------- WRITES ----------
+def save_many(docs, repair_after=SERIES_REPAIR_AFTER_SECONDS):
+    """
+    Stores snapshot documents (with snapshotDate set), skipping days that already have
+    one. Days left half-written by an earlier save are rewritten from `docs` once their
+    holdings are repair_after seconds old. Returns the number of snapshots written.
+    """
+    global _indexed
+    if not docs:
+        return 0
+
+    # the unique snapshotDate index is what keeps concurrent writers from duplicating a day
+    if not _indexed:
+        try:
+            ensure_indexes()
+        except OperationFailure as e:
+            _indexed = True  # warn once per process, saving still works without it
+            print(f"[snapshots] snapshotDate index not created, days can be duplicated until it is: {e}")
+
+    written = _insert_new_days(docs, repair_after)
+    if written:
+        versions.bump("snapshots")
+    return written
+
+
+def _missing_series(days, repair_after):
+    """
+    Of `days` already in portfolio_holdings, the ones with no portfolio_series document.
+    """
+    db = mongo.get_db()
+    present = {doc["snapshotDate"] for doc in db[SERIES].find({"snapshotDate": {"$in": days}}, {"_id": 0, "snapshotDate": 1})}
+    cutoff = dt.datetime.now(dt.timezone.utc) - dt.timedelta(seconds=repair_after)
+    return {
+        doc["snapshotDate"]
+        for doc in db[HOLDINGS].find({"snapshotDate": {"$in": [d for d in days if d not in present]}}, {"snapshotDate": 1})
+        if doc["_id"].generation_time <= cutoff
+    }
+
+
+def _insert_new_days(docs, repair_after):
+    db = mongo.get_db()
+
+    if not timeseries_enabled():
+        try:
+            result = db[LEGACY].bulk_write(
+                [UpdateOne({"snapshotDate": d["snapshotDate"]}, {"$setOnInsert": d}, upsert=True) for d in docs],
+                ordered=False,
+            )
+            return result.upserted_count
+        except BulkWriteError as e:
+            # two writers upserting the same new day at once
+            _duplicate_indexes(e)
+            return e.details["nUpserted"]
+
+    # holdings go first: its unique snapshotDate index decides which days are new
+    split = [_split(doc) for doc in docs]
+    try:
+        db[HOLDINGS].bulk_write([InsertOne(h) for _, h in split], ordered=False)
+        rejected = set()
+    except BulkWriteError as e:
+        rejected = _duplicate_indexes(e)
+
+    # rejected days normally have both halves already, rewrite the ones that don't
+    repair = _missing_series([split[i][1]["snapshotDate"] for i in rejected], repair_after) if rejected else set()
+    repair_ops = [
+        UpdateOne({"snapshotDate": h["snapshotDate"]}, {"$set": h})
+        for i, (_, h) in enumerate(split) if i in rejected and h["snapshotDate"] in repair
+    ]
+    if repair_ops:
+        db[HOLDINGS].bulk_write(repair_ops, ordered=False)
+
+    series_docs = [
+        s for i, (s, _) in enumerate(split)
+        if i not in rejected or s["snapshotDate"] in repair
+    ]
+    if series_docs:
+        db[SERIES].insert_many(series_docs, ordered=False)
+
+    return len(series_docs)
+
+
+def save(doc):
+    """
+    Stores one snapshot. Returns False if the day already had one.
+    """
+    return save_many([doc]) == 1
+
+
+def update_many(docs):
+    """
+    Sets recomputed fields on existing snapshots. Each doc carries the _id / snapshotDate
+    it was read with (see holdings_docs) plus the fields to overwrite.
+    """
+    if not docs:
+        return 0
+    db = mongo.get_db()
+
+    if not timeseries_enabled():
+        result = db[LEGACY].bulk_write(
+            [UpdateOne({"_id": d["_id"]}, {"$set": {k: v for k, v in d.items() if k != "_id"}}) for d in docs],
+            ordered=False,
+        )
+        versions.bump("snapshots")
+        return result.modified_count
+
+    holdings_ops, series_ops = [], []
+    for doc in docs:
+        day = {"snapshotDate": doc["snapshotDate"]}
+        holdings_fields = {k: doc[k] for k in ("portfolio", "savingsTotal") if k in doc}
+        series_fields = {k: doc[k] for k in SERIES_FIELDS if k in doc}
+
+        if holdings_fields:
+            holdings_ops.append(UpdateOne(day, {"$set": holdings_fields}))
+        if series_fields:
+            # time-series collections only accept multi-document updates
+            series_ops.append(UpdateMany(day, {"$set": series_fields}))
+
+    if holdings_ops:
+        db[HOLDINGS].bulk_write(holdings_ops, ordered=False)
+    if series_ops:
+        db[SERIES].bulk_write(series_ops, ordered=False)
+
+    versions.bump("snapshots")
+    return len(docs)
+
+
+# ---------- READS ----------
+def history(fields=SERIES_FIELDS):
+    """
+    Scalar series of every snapshot, oldest first.
+    """
+    coll = mongo.get_db()[SERIES if timeseries_enabled() else LEGACY]
+    projection = {"_id": 0, "timestampAdded": 1, **{field: 1 for field in fields}}
+    return list(coll.find({}, projection).sort("timestampAdded", 1))
+
+
+def latest(n=1, fields=SERIES_FIELDS):
+    """
+    The n most recent snapshots' scalar fields, newest first.
+    """
+    coll = mongo.get_db()[SERIES if timeseries_enabled() else LEGACY]
+    projection = {"_id": 0, "timestampAdded": 1, **{field: 1 for field in fields}}
+    return list(coll.find({}, projection).sort("timestampAdded", -1).limit(n))
+
+
+def holdings_docs(extra_fields=()):
+    """
+    Snapshots that have a holdings array, with timestampAdded, snapshotDate and portfolio.
+    """
+    coll = mongo.get_db()[HOLDINGS if timeseries_enabled() else LEGACY]
+    projection = {"timestampAdded": 1, "snapshotDate": 1, "portfolio": 1, **{f: 1 for f in extra_fields}}
+    return coll.find({"portfolio.0": {"$exists": True}}, projection)
+
+
+def snapshot_days():
+    """
+    Dates (UTC midnight) that already have a snapshot.
+    """
+    coll = mongo.get_db()[SERIES if timeseries_enabled() else LEGACY]
+    stamps = [doc["timestampAdded"] for doc in coll.find({}, {"_id": 0, "timestampAdded": 1})]
+    return set(pd.to_datetime(stamps, utc=True).tz_localize(None).normalize())
+
+
+# ===================== MIGRATION ===================== #
+
+def migrate(batch_size=500, dry_run=False):
+    """
+    Copies portfolio_value into the time-series layout. Idempotent: days already present in
+    portfolio_series are skipped and days only in portfolio_holdings are rewritten, so an
+    interrupted migration can simply be re-run.
+    The legacy collection is left in place; drop it once the dashboard reads correctly.
+    """
+    global _timeseries
+    db = mongo.get_db()
+
+    if not dry_run:
+        try:
+            db.create_collection(SERIES, timeseries={"timeField": "timestampAdded", "granularity": "hours"})
+        except CollectionInvalid:
+            pass  # already created by an earlier run
+        with _lock:
+            _timeseries = True
+        ensure_indexes()
+
+    # a day counts as migrated once its series document exists, holdings alone means the run stopped in between
+    migrated = set()
+    if SERIES in db.list_collection_names():
+        migrated = {doc["snapshotDate"] for doc in db[SERIES].find({}, {"_id": 0, "snapshotDate": 1})}
+
+    # if a day has several legacy snapshots, the last one wins
+    by_day = {}
+    for doc in db[LEGACY].find({}, {"_id": 0}).sort("timestampAdded", 1):
+        day = doc.get("snapshotDate") or doc["timestampAdded"].strftime("%Y-%m-%d")
+        by_day[day] = dict(doc, snapshotDate=day)
+
+    pending = [doc for day, doc in sorted(by_day.items()) if day not in migrated]
+    print(f"[migrate] {len(by_day)} days in {LEGACY}, {len(pending)} to migrate")
+    if dry_run:
+        return len(pending)
+
+    written = 0
+    for i in range(0, len(pending), batch_size):
+        written += save_many(pending[i:i + batch_size], repair_after=0)
+        print(f"[migrate] {written}/{len(pending)} snapshots migrated")
+
+    return written
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Snapshot storage tools")
+    subparsers = parser.add_subparsers(dest="command", required=True)
+
+    migrate_parser = subparsers.add_parser("migrate", help="move portfolio_value into the time-series layout")
+    migrate_parser.add_argument("--batch-size", type=int, default=500)
+    migrate_parser.add_argument("--dry-run", action="store_true", help="only count what would be migrated")
+
+    args = parser.parse_args()
+    if args.command == "migrate":
+        migrate(args.batch_size, args.dry_run)
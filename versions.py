@@ -0,0 +1,64 @@
+import os
+import hashlib
+import datetime as dt
+from flask import jsonify, request
+import mongo
+
+# ===================== DATA VERSIONS ===================== #
+
+# One counter per locally stored dataset, bumped whenever an ingestion path writes to it.
+# Dashboards poll these instead of re-fetching everything to find out whether anything changed.
+COLLECTION = "data_versions"
+
+# how often open dashboards check for new data
+POLL_SECONDS = int(os.getenv("VERSION_POLL_SECONDS", "60"))
+
+
+def bump(*datasets):
+    """
+    Marks datasets as changed.
+    """
+    coll = mongo.get_db()[COLLECTION]
+    now = dt.datetime.now(dt.timezone.utc)
+    for dataset in datasets:
+        coll.update_one({"_id": dataset}, {"$inc": {"version": 1}, "$set": {"updatedAt": now}}, upsert=True)
+
+
+def current():
+    """
+    {dataset: version} for every dataset that has been written at least once.
+    """
+    coll = mongo.get_db()[COLLECTION]
+    return {doc["_id"]: doc["version"] for doc in coll.find({}, {"version": 1})}
+
+
+def token(dataset_versions):
+    """
+    Short fingerprint of a versions dict, handy as an ETag.
+    """
+    payload = ",".join(f"{k}={v}" for k, v in sorted(dataset_versions.items()))
+    return hashlib.sha1(payload.encode()).hexdigest()[:16]
+
+
+def changed(old, new):
+    """
+    Datasets whose version differs between two versions dicts.
+    """
+    old = old or {}
+    return sorted(k for k in set(old) | set(new) if old.get(k) != new.get(k))
+
+
+def init_app(server):
+    """
+    Registers GET /data-version on the Dash Flask server.
+    """
+    @server.route("/data-version")
+    def data_version_endpoint():
+        dataset_versions = current()
+        fingerprint = token(dataset_versions)
+
+        # clients sending If-None-Match get an empty 304 while nothing has changed
+        response = jsonify({"versions": dataset_versions, "token": fingerprint})
+        response.headers["Cache-Control"] = "no-cache"
+        response.set_etag(fingerprint)
+        return response.make_conditional(request)
@@ -0,0 +1,169 @@
+import os
+import json
+import base64
+import hashlib
+import hmac
+import argparse
+import requests
+from flask import jsonify, request
+import data
+
+try:
+    from Cryptodome.Hash import SHA512
+    from Cryptodome.PublicKey import RSA
+    from Cryptodome.Signature import pkcs1_15
+except ImportError:  # shared secret signatures only
+    RSA = None
+
+# ===================== STARLING WEBHOOKS ===================== #
+
+# Starling pushes a "feed item" event for every new or updated transaction, so new data
+# lands in the local stores as it happens instead of waiting for the next transactions-between poll.
+#
+# Signatures are checked against X-Hook-Signature, either:
+#   STARLING_WEBHOOK_PUBLIC_KEY  base64 RSA-SHA512 signature of the body (Starling's v2 webhooks)
+#   STARLING_WEBHOOK_SECRET      base64 SHA-512 of secret + body (shared secret, also used by replay)
+WEBHOOK_PATH = "/webhooks/starling"
+WEBHOOK_SECRET = os.getenv("STARLING_WEBHOOK_SECRET")
+WEBHOOK_PUBLIC_KEY = os.getenv("STARLING_WEBHOOK_PUBLIC_KEY")  # PEM, or base64 DER as shown in the developer portal
+SIGNATURE_HEADER = "X-Hook-Signature"
+
+# WEBHOOK_PUBLIC_KEY parsed by init_app, None if unset or unusable
+_public_key = None
+
+
+def sign(body, secret=WEBHOOK_SECRET):
+    """
+    Shared secret signature of a raw request body.
+    """
+    return base64.b64encode(hashlib.sha512(secret.encode() + body).digest()).decode()
+
+
+def load_public_key(key=WEBHOOK_PUBLIC_KEY):
+    """
+    RSA key from PEM or base64 DER. Raises ValueError if it's neither.
+    """
+    if "BEGIN PUBLIC KEY" not in key:
+        key = base64.b64decode(key)
+    return RSA.import_key(key)
+
+
+def _rsa_verified(body, signature):
+    try:
+        pkcs1_15.new(_public_key).verify(SHA512.new(body), base64.b64decode(signature))
+        return True
+    except (ValueError, TypeError):
+        return False
+
+
+def verified(body, signature):
+    if not signature:
+        return False
+    if _public_key is not None and _rsa_verified(body, signature):
+        return True
+    if WEBHOOK_SECRET:
+        return hmac.compare_digest(sign(body), signature)
+    return False
+
+
+def ingest(event):
+    """
+    Stores the feed item carried by a webhook event. Returns (store, count), store is
+    None for accounts the dashboard doesn't track.
+    """
+    if not isinstance(event, dict):
+        raise ValueError("event is not a JSON object")
+    item = event.get("content") or {}
+    if not isinstance(item, dict) or "feedItemUid" not in item:
+        raise ValueError("event has no feed item")
+
+    store = data.store_for_account(item.get("accountUid"))
+    if store is None:
+        return None, 0
+
+    return store, data.save_feed_items(store, [item])
+
+
+def init_app(server):
+    """
+    Registers POST /webhooks/starling on the Dash Flask server.
+    """
+    if not (WEBHOOK_SECRET or WEBHOOK_PUBLIC_KEY):
+        print("[webhook] No STARLING_WEBHOOK_SECRET or STARLING_WEBHOOK_PUBLIC_KEY set, webhooks disabled")
+        return
+    global _public_key
+    if WEBHOOK_PUBLIC_KEY and RSA is None:
+        print("[webhook] pycryptodomex not installed, STARLING_WEBHOOK_PUBLIC_KEY ignored")
+    elif WEBHOOK_PUBLIC_KEY:
+        try:
+            _public_key = load_public_key()
+        except (ValueError, TypeError, IndexError) as e:
+            print(f"[webhook] STARLING_WEBHOOK_PUBLIC_KEY is not a valid RSA public key, ignored: {e}")
+    if _public_key is None and not WEBHOOK_SECRET:
+        print("[webhook] No usable signing key, webhooks disabled")
+        return
+
+    @server.route(WEBHOOK_PATH, methods=["POST"])
+    def starling_webhook():
+        body = request.get_data()
+        if not verified(body, request.headers.get(SIGNATURE_HEADER)):
+            return jsonify({"error": "invalid signature"}), 401
+
+        try:
+            store, count = ingest(json.loads(body))
+        except ValueError as e:
+            return jsonify({"error": str(e)}), 400
+
+        # Starling retries anything that isn't a 2xx, so unknown accounts are acknowledged too
+        print(f"[webhook] {request.headers.get('X-Hook-Event-Uid', 'event')}: {count} item(s) stored in {store}")
+        return jsonify({"store": store, "stored": count})
+
+
+# ===================== LOCAL REPLAY ===================== #
+
+def replay(path, url, secret=WEBHOOK_SECRET):
+    """
+    Posts every event in a JSON lines file to a running dashboard, signed with the
+    shared secret. Lines can be whole webhook events or bare feed items, e.g. ones
+    exported from the savings collection.
+    """
+    results = {"stored": 0, "failed": 0}
+
+    with open(path) as f:
+        for line in f:
+            if not line.strip():
+                continue
+            event = json.loads(line)
+            if "content" not in event:
+                event = {"content": event}
+
+            body = json.dumps(event, default=str).encode()
+            response = requests.post(
+                url,
+                data=body,
+                headers={"Content-Type": "application/json", SIGNATURE_HEADER: sign(body, secret)},
+                timeout=10,
+            )
+            if response.ok:
+                results["stored"] += response.json().get("stored", 0)
+            else:
+                results["failed"] += 1
+                print(f"[replay] {response.status_code}: {response.text.strip()}")
+
+    print(f"[replay] {results['stored']} item(s) stored, {results['failed']} event(s) rejected")
+    return results
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Starling webhook tools")
+    subparsers = parser.add_subparsers(dest="command", required=True)
+
+    replay_parser = subparsers.add_parser("replay", help="post recorded events to a running dashboard")
+    replay_parser.add_argument("path", help="JSON lines file of webhook events or feed items")
+    replay_parser.add_argument("--url", default=f"http://localhost:8050{WEBHOOK_PATH}")
+
+    args = parser.parse_args()
+    if args.command == "replay":
+        if not WEBHOOK_SECRET:
+            parser.error("replay signs events with STARLING_WEBHOOK_SECRET, set it first")
+        replay(args.path, args.url)
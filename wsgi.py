@@ -0,0 +1,12 @@
+"""
+Production entry point. Runs the dashboard under gunicorn with several workers:
+
+    gunicorn wsgi:server
+
+Settings live in gunicorn.conf.py. API responses and built figures are shared
+between the workers through the SQLite cache at CACHE_PATH (see cache.py).
+"""
+from dashboard import server
+
+if __name__ == "__main__":
+    server.run()